@@ -0,0 +1,199 @@
+# Name: Shipwrecked benchmarks
+# Times the hot paths of the game headlessly and compares them with the
+# baseline stored for the same machine so that regressions show up between versions
+#
+# times only compare on the machine that took them, so each machine keeps its
+# own baseline, named after its system, processor and python unless --machine
+# names it. On CI, save a baseline once on a quiet runner with
+#     python benchmark.py --save --runs 5 --machine ci
+# commit it, and check every change on the same kind of runner with
+#     python benchmark.py --fail --machine ci
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame, json, time, argparse, platform, tempfile
+from pygame.locals import *
+import shipwrecked, headless
+
+BASELINE = "benchmark_baseline.json"
+
+def measure(function, number, repeat=5, setup=None):
+    '''measure(function, number, repeat=5, setup=None) -> float
+    returns the best time in microseconds of one call out of repeat runs of number calls
+    setup is called untimed before each call if given'''
+    best = None
+    for i in range(repeat):
+        if setup == None:
+            start = time.perf_counter()
+            for j in range(number):
+                function()
+            seconds = (time.perf_counter()-start)/number
+        else:
+            seconds = 0
+            for j in range(number):
+                setup()
+                start = time.perf_counter()
+                function()
+                seconds += (time.perf_counter()-start)/number
+        if best == None or seconds < best:
+            best = seconds
+    return best*1000000
+
+def level_script(count):
+    '''level_script(count) -> str
+    writes a word script with one level of count words taken from
+    word_script.txt and returns its file name'''
+    file = open("word_script.txt")
+    words = []
+    for line in file.read().split("\n"):
+        for variant in line.split("||")[1:]:
+            words += variant.split("|")[0].split()
+    file.close()
+
+    script = os.path.join(tempfile.gettempdir(), f"shipwrecked_benchmark_{count}.txt")
+    file = open(script, "w")
+    file.write("Benchmark||"+" ".join(words[i%len(words)] for i in range(count))+"|Benchmark\n")
+    file.close()
+    return script
+
+def new_game(script="word_script.txt"):
+    '''new_game(script="word_script.txt") -> Shipwrecked
+    returns a game that is set up but not running'''
+    shipwrecked.gameClock.set_source(headless.SimulatedTime(1).time)
+    return shipwrecked.Shipwrecked(mute=True, run=False, script=script)
+
+def start_level(game):
+    '''start_level(game) -> None
+    sets up the first level with its first bottles in view'''
+    game.level.redo_level()
+    game.level.set_up_bottles()
+    game.isTitle = False
+    game.play()
+    for i in range(5):
+        game.move_next_bottle()
+
+def micro_benchmarks():
+    '''micro_benchmarks() -> dict
+    returns the microseconds per call of each hot path'''
+    results = {}
+    game = new_game(level_script(60))
+    start_level(game)
+    renderer = game.get_renderer()
+    bottle = game.get_bottles()[0]
+
+    def draw_word():
+        bottle.draw_word()
+        renderer.items.clear()
+    results["Bottle.draw_word"] = measure(draw_word, 2000)
+
+    def bottle_update():
+        game.get_bottles().step()
+        bottle.update()
+        renderer.items.clear()
+    results["Bottle.update"] = measure(bottle_update, 2000)
+
+    word = str(bottle)
+    results["Bottle.match"] = measure(lambda: bottle.match(word[:2]), 5000)
+
+    # typing one letter and clearing it again
+    field = game.get_field()
+    letter = pygame.event.Event(KEYDOWN, key=K_a, mod=0, unicode="a", scancode=0)
+    def process_key():
+        field.process_key(letter)
+        field.set("")
+    results["TextField.process_key"] = measure(process_key, 2000)
+
+    # level end with every other word collected
+    for bottle in game.get_bottles()[::2]:
+        game.get_bottles().collect(bottle.index)
+        bottle.removed = 101
+    game.get_clock().currentTime = 30
+    def end_level():
+        game.level.end_level()
+        game.level.start_summary(shipwrecked.assetCache.copy("level.png"))
+    results["Level.end_level"] = measure(end_level, 20)
+
+    # the same level end with the summary built as the bottles left
+    for index in range(len(game.get_bottles())):
+        game.get_bottles().state[index] = shipwrecked.BottleStore.GONE
+    def summarize():
+        game.level.start_summary(shipwrecked.assetCache.copy("level.png"))
+        game.level.summarize()
+    results["Level.end_level summarized"] = measure(game.level.end_level, 20, setup=summarize)
+
+    results["Shipwrecked.__init__"] = measure(new_game, 5, 10)
+    return results
+
+def macro_benchmarks(sizes=(20, 100, 500)):
+    '''macro_benchmarks(sizes) -> dict
+    returns the frame times in microseconds of whole levels of each size'''
+    results = {}
+    for size in sizes:
+        report = headless.run(seed=1, maxRetries=0, traceAllocations=False, script=level_script(size))
+        results[f"level {size} words mean frame"] = report["frameTimes"]["meanMs"]*1000
+        results[f"level {size} words p95 frame"] = report["frameTimes"]["p95Ms"]*1000
+    return results
+
+def compare(results, baseline, tolerance):
+    '''compare(results, baseline, tolerance) -> list
+    prints results next to baseline and returns the names that regressed'''
+    regressed = []
+    print(f"{'benchmark':40}{'us':>12}{'baseline':>12}{'change':>10}")
+    for name, value in results.items():
+        if name in baseline:
+            change = value/baseline[name]-1
+            flag = ""
+            if change > tolerance:
+                regressed.append(name)
+                flag = "  REGRESSED"
+            print(f"{name:40}{value:12.1f}{baseline[name]:12.1f}{change*100:9.1f}%{flag}")
+        else:
+            print(f"{name:40}{value:12.1f}{'-':>12}")
+    return regressed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmark the hot paths of Shipwrecked")
+    parser.add_argument("--save", action="store_true", help="store the results as this machine's new baseline")
+    parser.add_argument("--micro", action="store_true", help="only run the micro benchmarks")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown counted as a regression")
+    parser.add_argument("--fail", action="store_true", help="exit with an error if anything regressed")
+    parser.add_argument("--runs", type=int, default=1, help="runs to keep the best time of each benchmark from")
+    parser.add_argument("--machine", default=None, help="name of the baseline to compare with and save to")
+    args = parser.parse_args()
+
+    # the best of each benchmark over the runs
+    runs = []
+    pygame.init()
+    for run in range(args.runs):
+        runs.append(micro_benchmarks())
+    pygame.quit()
+    if not args.micro:
+        for run in range(args.runs):
+            runs.append(macro_benchmarks())
+    results = {}
+    for times in runs:
+        for name, value in times.items():
+            results[name] = min(value, results.get(name, value))
+
+    machine = args.machine
+    if machine == None:
+        machine = f"{platform.system()}-{platform.machine()}-python{platform.python_version()}"
+    machines = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE) as file:
+            machines = json.load(file).get("machines", {})
+    if machine not in machines:
+        print(f"no baseline for {machine}, save one with --save")
+    baseline = machines.get(machine, {"results": {}})["results"]
+    regressed = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        machines[machine] = {"python": platform.python_version(), "pygame": pygame.version.ver,
+            "results": dict(baseline, **results)}
+        with open(BASELINE, "w") as file:
+            json.dump({"machines": machines}, file, indent=2)
+    elif args.fail and len(regressed) > 0:
+        raise SystemExit(1)
@@ -0,0 +1,267 @@
+# Name: Shipwrecked headless
+# Plays Shipwrecked without a display or audio device, typed by a
+# scripted typist on a simulated clock, and reports how it ran
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame, random, json, time, tracemalloc, argparse
+from pygame.locals import *
+import shipwrecked
+
+class SimulatedTime:
+    '''a clock that only moves when it is advanced'''
+
+    def __init__(self, start=0):
+        '''SimulatedTime(start=0) -> SimulatedTime
+        constructs a clock starting at start seconds'''
+        self.now = start
+
+    def time(self):
+        '''SimulatedTime.time() -> float
+        returns the current simulated time'''
+        return self.now
+
+    def advance(self, seconds):
+        '''SimulatedTime.advance(seconds) -> None
+        moves the clock forward by seconds'''
+        self.now += seconds
+
+class Typist:
+    '''types the words in view like a player would'''
+
+    def __init__(self, game, wpm=100, errorRate=0.02, seed=None):
+        '''Typist(game, wpm=100, errorRate=0.02, seed=None) -> Typist
+        constructs a typist for game typing at wpm words per minute
+        who mistypes a letter with the chance errorRate'''
+        self.game = game
+        self.random = random.Random(seed)
+        self.keyTime = 60/(wpm*5)
+        self.errorRate = errorRate
+        self.nextKey = 0
+        self.keys = []
+        self.target = None
+        self.submitted = 0
+        self.mistyped = 0
+
+        # keys that need shift
+        self.shifted = {char: key for key, char in game.get_field().keyMap.items()}
+
+    def key_event(self, char):
+        '''Typist.key_event(char) -> Event
+        returns the key down event that types char'''
+        if char == " ":
+            return pygame.event.Event(KEYDOWN, key=K_SPACE, mod=0, unicode=" ", scancode=0)
+        if char in self.shifted:
+            return pygame.event.Event(KEYDOWN, key=ord(self.shifted[char]), mod=KMOD_LSHIFT, unicode=char, scancode=0)
+        return pygame.event.Event(KEYDOWN, key=ord(char), mod=0, unicode=char, scancode=0)
+
+    def choose_word(self):
+        '''Typist.choose_word() -> None
+        queues the keys for the leftmost word in view'''
+        targets = [bottle for bottle in self.game.get_bottles() if bottle.in_view() and bottle.has_word()]
+        if len(targets) == 0:
+            return
+
+        self.target = min(targets, key=lambda bottle: bottle.pos[0])
+        word = str(self.target)
+        for char in word:
+            if self.random.random() < self.errorRate:
+                char = self.random.choice("abcdefghijklmnopqrstuvwxyz".replace(char.lower(), ""))
+                self.mistyped += 1
+            self.keys.append(char)
+        self.keys.append(" ")
+
+    def update(self, now):
+        '''Typist.update(now) -> None
+        presses the next key if it is time to'''
+        if not self.game.started or self.game.is_paused() or now < self.nextKey:
+            return
+
+        if len(self.keys) == 0:
+            self.choose_word()
+            if len(self.keys) == 0:
+                return
+
+        char = self.keys.pop(0)
+        pygame.event.post(self.key_event(char))
+        if char == " ":
+            self.submitted += 1
+        self.nextKey = now+self.keyTime*self.random.uniform(0.5, 1.5)
+
+def click(pos):
+    '''click(pos) -> None
+    posts a left mouse click at pos'''
+    pygame.event.post(pygame.event.Event(MOUSEBUTTONDOWN, pos=pos, button=1))
+
+def summarize(frameTimes):
+    '''summarize(frameTimes) -> dict
+    returns the mean, percentiles and max of frameTimes in ms'''
+    frameTimes = sorted(frameTimes)
+    return {
+        "meanMs": sum(frameTimes)/max(len(frameTimes), 1)*1000,
+        "p50Ms": frameTimes[len(frameTimes)//2]*1000 if frameTimes else 0,
+        "p95Ms": frameTimes[int(len(frameTimes)*0.95)]*1000 if frameTimes else 0,
+        "p99Ms": frameTimes[int(len(frameTimes)*0.99)]*1000 if frameTimes else 0,
+        "maxMs": frameTimes[-1]*1000 if frameTimes else 0}
+
+def run(wpm=160, errorRate=0.02, fps=60, seed=None, maxRetries=3, maxFrames=1000000, traceAllocations=True,
+    script="word_script.txt", log=None, record=None, profile=None, practice=None):
+    '''run(wpm, errorRate, fps, seed, maxRetries, maxFrames, traceAllocations, script, log, record, profile,
+        practice) -> dict
+    plays every level of script headlessly, or practice levels made from the
+    words practice, logging events to log, recording the session to the file
+    record and keeping results in the database profile, and returns the report'''
+    clock = SimulatedTime()
+    shipwrecked.gameClock.set_source(clock.time)
+    pygame.init()
+    shipwrecked.fontRegistry.clear()
+    if traceAllocations:
+        tracemalloc.start()
+
+    session = None
+    if record != None:
+        session = shipwrecked.Recorder(seed, clock.time)
+
+    wallStart = time.perf_counter()
+    game = shipwrecked.Shipwrecked(mute=True, fps=fps, run=False, script=script, log=log, seed=seed, session=session,
+        profile=profile, practice=practice)
+    typist = Typist(game, wpm, errorRate, seed)
+    frameTimes = []
+    levels = []
+    retries = 0
+    endedAt = None
+
+    click((600, 375))
+    while game.running and len(frameTimes) < maxFrames:
+        clock.advance(1/fps)
+        typist.update(clock.time())
+
+        start = time.perf_counter()
+        game.frame()
+        frameTimes.append(time.perf_counter()-start)
+
+        # wait for the level end to slide in, then go on
+        level = game.level
+        if level.is_ended() and endedAt == None:
+            endedAt = len(frameTimes)
+            levels.append({"level": level.levelNum, "correct": game.get_bottles_correct(),
+                "total": len(game.get_bottles()), "missed": level.missed, "paceWpm": game.get_pacer().get_wpm()})
+        elif level.is_ended() and len(frameTimes)-endedAt == fps:
+            if not level.missed:
+                click((760, 378))
+                retries = 0
+            elif retries < maxRetries:
+                click((600, 378))
+                retries += 1
+            else:
+                break
+        elif not level.is_ended():
+            endedAt = None
+
+        if game.ship.is_finished() and game.win.is_finished():
+            break
+
+    wallTime = time.perf_counter()-wallStart
+    allocations = {}
+    if traceAllocations:
+        current, peak = tracemalloc.get_traced_memory()
+        allocations = {"currentBytes": current, "peakBytes": peak}
+        tracemalloc.stop()
+
+    report = {
+        "frames": len(frameTimes),
+        "simulatedSeconds": clock.time(),
+        "wallSeconds": wallTime,
+        "frameTimes": summarize(frameTimes),
+        "allocations": allocations,
+        "wordsSubmitted": typist.submitted,
+        "wordsMatched": sum(level["correct"] for level in levels),
+        "lettersMistyped": typist.mistyped,
+        "levels": levels,
+        "completed": game.ship.is_finished(),
+        "subsystems": game.get_stats().get_stats()["subsystems"],
+        "glyphCache": shipwrecked.glyphCache.get_stats()}
+    game.get_loader().shutdown()
+    game.get_log().close()
+    game.get_profile().close()
+    pygame.quit()
+    if record != None:
+        session.save(record)
+    return report
+
+def replay(file, script="word_script.txt", slowest=10, profile=None, profileFile="replay.prof"):
+    '''replay(file, script, slowest, profile, profileFile) -> dict
+    plays the session recorded in file again frame by frame and returns
+    the report with the slowest frames
+    profile is (first frame, frames) to profile into profileFile'''
+    session = shipwrecked.Replay(file)
+    pygame.init()
+    shipwrecked.fontRegistry.clear()
+
+    game = shipwrecked.Shipwrecked(mute=True, run=False, script=script, session=session)
+    frameTimes = []
+    while game.running and not session.is_finished():
+        if profile != None and len(frameTimes) == profile[0]:
+            game.get_profiler().start(profile[1], profileFile)
+        start = time.perf_counter()
+        game.frame()
+        frameTimes.append(time.perf_counter()-start)
+
+    report = {
+        "frames": len(frameTimes),
+        "recordedFrames": len(session),
+        "frameTimes": summarize(frameTimes),
+        "slowestFrames": [{"frame": frame, "ms": frameTimes[frame]*1000}
+            for frame in sorted(range(len(frameTimes)), key=lambda frame: -frameTimes[frame])[:slowest]],
+        "completed": game.ship.is_finished(),
+        "subsystems": game.get_stats().get_stats()["subsystems"]}
+    game.get_profiler().stop()
+    game.get_loader().shutdown()
+    game.get_log().close()
+    pygame.quit()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play Shipwrecked headlessly and report how it ran")
+    parser.add_argument("--wpm", type=float, default=160, help="typing speed of the typist")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="chance of mistyping each letter")
+    parser.add_argument("--fps", type=int, default=60, help="simulated frames per second")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the typist and the game")
+    parser.add_argument("--max-retries", type=int, default=3, help="redos of a failed level before giving up")
+    parser.add_argument("--no-allocations", action="store_true", help="do not trace allocations")
+    parser.add_argument("--script", default="word_script.txt", help="word script with the levels to play")
+    parser.add_argument("--report", default=None, help="file to write the json report to")
+    parser.add_argument("--log", default=None, help="event log to append to, binary if it ends in .bin")
+    parser.add_argument("--record", default=None, help="file to record the session to")
+    parser.add_argument("--player-db", default=None, help="database to keep the player's results in")
+    parser.add_argument("--practice", nargs="?", const=True, default=None,
+        help="play practice levels from a word list, or the script's words if no list is given")
+    parser.add_argument("--replay", default=None, help="recorded session to play again instead of typing")
+    parser.add_argument("--profile", default=None, help="frames FIRST:COUNT of the replay to profile")
+    parser.add_argument("--profile-file", default="replay.prof", help="file to dump the profile to")
+    args = parser.parse_args()
+
+    if args.replay != None:
+        profile = None
+        if args.profile != None:
+            profile = tuple(int(frame) for frame in args.profile.split(":"))
+        report = replay(args.replay, args.script, profile=profile, profileFile=args.profile_file)
+    else:
+        practice = None
+        if args.practice == True:
+            practice = shipwrecked.load_level_pack(args.script).get_words()
+        elif args.practice != None:
+            practice = shipwrecked.read_word_list(args.practice)
+        if practice != None and len(practice) == 0:
+            parser.error(f"no words to practice with in {args.practice}")
+        report = run(args.wpm, args.error_rate, args.fps, args.seed, args.max_retries,
+            traceAllocations=not args.no_allocations, script=args.script, log=args.log, record=args.record,
+            profile=args.player_db, practice=practice)
+    if args.report == None:
+        print(json.dumps(report, indent=2))
+    else:
+        with open(args.report, "w") as file:
+            json.dump(report, file, indent=2)
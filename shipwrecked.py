@@ -5,80 +5,1528 @@
 
 # Graphics made by G.G.Otto
 
-import pygame, time, random
+import pygame, time, random, collections, struct, mmap, os, tempfile, array, math
+import concurrent.futures, threading, queue, json, cProfile, sqlite3, uuid, argparse
 from pygame.locals import *
 
+class GameClock:
+    '''the clock that every timed object of the game runs on
+
+    game time only moves in the fixed ticks the game steps by, while the
+    real time of the source is read once a frame to know how many to step'''
+
+    def __init__(self, source=time.perf_counter):
+        '''GameClock(source=time.perf_counter) -> GameClock
+        constructs a clock reading the monotonic time source()'''
+        self.source = source
+        self.realTime = source()
+        self.time = 0
+        self.scale = 1
+        self.paused = False
+
+    def tick(self):
+        '''GameClock.tick() -> float
+        reads the source once for the frame and returns the real seconds since the last read'''
+        now = self.source()
+        elapsed = now-self.realTime
+        self.realTime = now
+        return elapsed
+
+    def advance(self, seconds):
+        '''GameClock.advance(seconds) -> float
+        moves game time on by one tick of seconds unless paused and returns the game time'''
+        if not self.paused:
+            self.time += seconds*self.scale
+        return self.time
+
+    def get_time(self):
+        '''GameClock.get_time() -> float
+        returns the game time of this tick, which stops while paused'''
+        return self.time
+
+    def get_real_time(self):
+        '''GameClock.get_real_time() -> float
+        returns the source time of this frame, which never stops'''
+        return self.realTime
+
+    def set_source(self, source):
+        '''GameClock.set_source(source) -> None
+        makes the clock read source() such as a simulated clock in headless mode'''
+        self.source = source
+        self.realTime = source()
+
+    def set_scale(self, scale):
+        '''GameClock.set_scale(scale) -> None
+        makes game time pass scale times as fast as real time'''
+        self.scale = scale
+
+    def pause(self):
+        '''GameClock.pause() -> None
+        stops game time'''
+        self.paused = True
+
+    def resume(self):
+        '''GameClock.resume() -> None
+        lets game time pass again'''
+        self.paused = False
+
+gameClock = GameClock()
+
+class Stopwatch:
+    '''measures the game time that passes while it is running'''
+
+    def __init__(self):
+        '''Stopwatch() -> Stopwatch
+        constructs a stopped stopwatch at 0'''
+        self.start = None
+        self.saved = 0
+
+    def is_running(self):
+        '''Stopwatch.is_running() -> bool
+        returns whether the stopwatch is running'''
+        return self.start != None
+
+    def play(self):
+        '''Stopwatch.play() -> None
+        starts the stopwatch'''
+        if self.start == None:
+            self.start = gameClock.get_time()
+
+    def pause(self):
+        '''Stopwatch.pause() -> None
+        stops the stopwatch, keeping its time'''
+        if self.start != None:
+            self.saved += gameClock.get_time()-self.start
+            self.start = None
+
+    def reset(self):
+        '''Stopwatch.reset() -> None
+        sets the time back to 0'''
+        self.saved = 0
+        if self.start != None:
+            self.start = gameClock.get_time()
+
+    def get_time(self):
+        '''Stopwatch.get_time() -> float
+        returns the seconds the stopwatch has run'''
+        if self.start == None:
+            return self.saved
+        return self.saved+gameClock.get_time()-self.start
+
+def ease_linear(progress):
+    '''ease_linear(progress) -> float
+    moves at the same speed the whole way'''
+    return progress
+
+def ease_out_cubic(progress):
+    '''ease_out_cubic(progress) -> float
+    starts fast and slows down into place'''
+    return 1-(1-progress)**3
+
+def ease_out_in_sine(progress):
+    '''ease_out_in_sine(progress) -> float
+    speeds up and slows down at both ends, slowest in the middle'''
+    return progress+math.sin(2*math.pi*progress)/(2*math.pi)
+
+class Tween:
+    '''moves a position from start to end over duration seconds of game time'''
+
+    def __init__(self, start, end, duration, easing=ease_linear):
+        '''Tween(start, end, duration, easing=ease_linear) -> Tween
+        constructs a stopped tween from start to end, where easing maps the
+        fraction of time passed to the fraction of the way moved'''
+        self.start = tuple(start)
+        self.end = tuple(end)
+        self.duration = duration
+        self.easing = easing
+        self.began = None
+        self.settled = False
+        self.pos = self.start
+
+    def play(self):
+        '''Tween.play() -> None
+        starts moving from the start'''
+        self.began = gameClock.get_time()
+        self.settled = False
+        self.pos = self.start
+
+    def is_running(self):
+        '''Tween.is_running() -> bool
+        returns whether the tween was started and has not settled'''
+        return self.began != None and not self.settled
+
+    def is_finished(self):
+        '''Tween.is_finished() -> bool
+        returns whether the tween has settled at the end'''
+        return self.settled
+
+    def get_pos(self):
+        '''Tween.get_pos() -> tuple
+        returns the position of this tick'''
+        return self.pos
+
+    def step(self):
+        '''Tween.step() -> tuple
+        moves to the position for the game time and returns it'''
+        if not self.is_running():
+            return self.pos
+
+        progress = (gameClock.get_time()-self.began)/self.duration
+        if progress >= 1:
+            self.pos = self.end
+            self.settled = True
+        else:
+            amount = self.easing(progress)
+            self.pos = tuple(start+(end-start)*amount for start, end in zip(self.start, self.end))
+        return self.pos
+
+class GlyphCache:
+    '''caches rendered glyphs and word strips for the whole game'''
+
+    def __init__(self, size=4096):
+        '''GlyphCache(size=4096) -> GlyphCache
+        constructs a cache holding at most size surfaces'''
+        self.size = size
+        self.surfaces = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        '''GlyphCache.get(key) -> Surface
+        returns the cached surface for key or None'''
+        surface = self.surfaces.get(key)
+        if surface is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def add(self, key, surface):
+        '''GlyphCache.add(key, surface) -> Surface
+        adds surface to the cache, dropping the least recently used'''
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def render(self, font, text, color):
+        '''GlyphCache.render(font, text, color) -> Surface
+        returns text rendered with font in color'''
+        key = (font, text, color)
+        surface = self.get(key)
+        if surface is None:
+            surface = self.add(key, font.render(text, True, color))
+        return surface
+
+    def render_word(self, font, word, highlight, color, restColor=(255,255,255)):
+        '''GlyphCache.render_word(font, word, highlight, color, restColor) -> Surface
+        returns a strip of word with the first highlight letters in color
+        and the rest in restColor'''
+        key = (font, word, highlight, color, restColor)
+        strip = self.get(key)
+        if strip != None:
+            return strip
+
+        # lay out letter by letter
+        letters = []
+        for i in range(len(word)):
+            letters.append(self.render(font, word[i], color if i < highlight else restColor))
+        width = sum(letter.get_width() for letter in letters)
+        height = max([letter.get_height() for letter in letters]+[font.get_height()])
+
+        strip = pygame.Surface((width, height), SRCALPHA)
+        last = 0
+        for letter in letters:
+            # letters do not overlap, so adding copies the pixels exactly
+            strip.blit(letter, (last, 0), special_flags=BLEND_RGBA_ADD)
+            last += letter.get_width()
+        return self.add(key, strip)
+
+    def get_hit_rate(self):
+        '''GlyphCache.get_hit_rate() -> float
+        returns the fraction of lookups found in the cache'''
+        try:
+            return self.hits/(self.hits+self.misses)
+        except ZeroDivisionError:
+            return 0
+
+    def get_stats(self):
+        '''GlyphCache.get_stats() -> dict
+        returns the hits, misses, size and hit rate of the cache'''
+        return {"hits": self.hits, "misses": self.misses,
+            "size": len(self.surfaces), "hitRate": self.get_hit_rate()}
+
+glyphCache = GlyphCache()
+textCache = GlyphCache(512)
+
+class FontRegistry:
+    '''creates each font of the game once per process'''
+
+    def __init__(self):
+        '''FontRegistry() -> FontRegistry
+        constructs an empty font registry'''
+        self.files = {}
+        self.fonts = {}
+
+    def resolve(self, name, bold):
+        '''FontRegistry.resolve(name, bold) -> str
+        returns the file of the system font name, or None for the bundled font'''
+        if (name, bold) not in self.files:
+            self.files[(name, bold)] = pygame.font.match_font(name, bold)
+        return self.files[(name, bold)]
+
+    def get(self, name, size, bold=False):
+        '''FontRegistry.get(name, size, bold=False) -> Font
+        returns the font name at size, falling back to pygame's bundled font'''
+        key = (name, size, bold)
+        if key in self.fonts:
+            return self.fonts[key]
+
+        file = self.resolve(name, bold)
+        font = pygame.font.Font(file, size)
+        # fake bold if there is no bold file
+        if bold and (file == None or file == self.resolve(name, False)):
+            font.set_bold(True)
+        self.fonts[key] = font
+        return font
+
+    def clear(self):
+        '''FontRegistry.clear() -> None
+        forgets all fonts, which are invalid once pygame quits'''
+        self.fonts.clear()
+
+fontRegistry = FontRegistry()
+
+class AssetCache:
+    '''loads each image of the game once'''
+
+    def __init__(self):
+        '''AssetCache() -> AssetCache
+        constructs an empty asset cache'''
+        self.images = {}
+        self.stats = {}
+
+    def load(self, file):
+        '''AssetCache.load(file) -> Surface
+        returns the shared surface for file, converted to the display format'''
+        if file in self.images:
+            return self.images[file]
+
+        start = time.perf_counter()
+        image = pygame.image.load(file)
+        if pygame.display.get_surface() != None:
+            if image.get_flags() & SRCALPHA:
+                image = image.convert_alpha()
+            else:
+                image = image.convert()
+
+        self.images[file] = image
+        self.stats[file] = {"loadTime": time.perf_counter()-start,
+            "bytes": image.get_bytesize()*image.get_width()*image.get_height()}
+        return image
+
+    def copy(self, file):
+        '''AssetCache.copy(file) -> Surface
+        returns a copy of the surface for file that can be drawn on'''
+        return self.load(file).copy()
+
+    def get_stats(self):
+        '''AssetCache.get_stats() -> dict
+        returns the load time and memory of each asset'''
+        return self.stats
+
+assetCache = AssetCache()
+
+class Renderer:
+    '''draws the screen, redrawing only the regions that changed'''
+
+    def __init__(self, screen, background):
+        '''Renderer(screen, background) -> Renderer
+        constructs a renderer drawing over background on screen'''
+        self.screen = screen
+        self.background = background
+        self.items = []
+        self.lastItems = {}
+        self.full = True
+
+        # stats of the last frame
+        self.dirtyRects = []
+        self.blitArea = 0
+
+    def blit(self, surface, pos, changed=False, flags=0):
+        '''Renderer.blit(surface, pos, changed=False, flags=0) -> Rect
+        queues surface to be drawn at pos with the blit flags flags this frame
+        changed is True if the surface was drawn on since the last frame'''
+        rect = surface.get_rect(topleft=pos)
+        self.items.append((surface, rect, changed, flags))
+        return rect
+
+    def invalidate(self):
+        '''Renderer.invalidate() -> None
+        redraws the whole screen on the next frame'''
+        self.full = True
+
+    def get_dirty(self):
+        '''Renderer.get_dirty() -> list
+        returns the merged rects that changed since the last frame'''
+        screenRect = self.screen.get_rect()
+        if self.full:
+            return [screenRect]
+
+        # rects of surfaces that appeared, moved, changed or disappeared
+        current = {}
+        rects = []
+        for surface, rect, changed, flags in self.items:
+            key = (id(surface), tuple(rect))
+            current[key] = True
+            if changed or key not in self.lastItems:
+                rects.append(rect)
+        for key in self.lastItems:
+            if key not in current:
+                rects.append(self.lastItems[key][1])
+
+        # merge overlapping rects
+        merged = []
+        for rect in rects:
+            rect = rect.clip(screenRect)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect.union_ip(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def draw(self):
+        '''Renderer.draw() -> list
+        draws the queued surfaces in the dirty regions and returns the regions'''
+        self.dirtyRects = self.get_dirty()
+        self.blitArea = 0
+        for dirty in self.dirtyRects:
+            self.screen.set_clip(dirty)
+            self.screen.blit(self.background, dirty, dirty)
+            for surface, rect, changed, flags in self.items:
+                if rect.colliderect(dirty):
+                    self.screen.blit(surface, rect, special_flags=flags)
+            self.blitArea += dirty.width*dirty.height
+        self.screen.set_clip(None)
+
+        # keep the surfaces so their ids stay unique until the next frame
+        self.lastItems = {(id(surface), tuple(rect)): (surface, rect) for surface, rect, changed, flags in self.items}
+        self.items = []
+        self.full = False
+        return self.dirtyRects
+
+    def get_stats(self):
+        '''Renderer.get_stats() -> dict
+        returns the number of dirty rects and the area drawn last frame'''
+        return {"dirtyRects": len(self.dirtyRects), "blitArea": self.blitArea}
+
+class LevelPack:
+    '''reads levels from a compiled, memory-mapped level pack
+
+    the pack holds a header, an index of (offset, length) per level and one
+    record per level with its variants separated by RECORD_SEP and the
+    source and words of each variant separated by FIELD_SEP'''
+
+    MAGIC = b"SWPK"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHIdQ")
+    ENTRY = struct.Struct("<II")
+    RECORD_SEP = "\x1e"
+    FIELD_SEP = "\x1f"
+
+    def __init__(self, file):
+        '''LevelPack(file) -> LevelPack
+        opens the compiled level pack file'''
+        self.file = open(file, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.sourceTime, self.sourceSize = self.HEADER.unpack_from(self.data, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(f"{file} is not a level pack")
+
+    def __len__(self):
+        '''len(LevelPack) -> int
+        returns the number of levels'''
+        return self.count
+
+    def close(self):
+        '''LevelPack.close() -> None
+        closes the pack file'''
+        self.data.close()
+        self.file.close()
+
+    def get_variants(self, levelNum):
+        '''LevelPack.get_variants(levelNum) -> list
+        returns a (words, source) tuple for each variant of level levelNum'''
+        offset, length = self.ENTRY.unpack_from(self.data, self.HEADER.size+self.ENTRY.size*(levelNum-1))
+        variants = []
+        for record in self.data[offset:offset+length].decode("utf-8").split(self.RECORD_SEP):
+            fields = record.split(self.FIELD_SEP)
+            variants.append((fields[1:], fields[0]))
+        return variants
+
+    def get_words(self):
+        '''LevelPack.get_words() -> list
+        returns the words of every variant of every level'''
+        words = []
+        for levelNum in range(1, self.count+1):
+            for variant in self.get_variants(levelNum):
+                words += variant[0]
+        return words
+
+    def choose(self, levelNum, random=random):
+        '''LevelPack.choose(levelNum, random=random) -> tuple
+        returns the (words, source) of a variant of level levelNum chosen by random'''
+        return random.choice(self.get_variants(levelNum))
+
+def compile_level_pack(script, pack):
+    '''compile_level_pack(script, pack) -> None
+    compiles the levels of the word script file into the pack file
+    each script line is a label followed by variants "words|source" all separated by "||"'''
+    file = open(script, encoding="utf-8")
+    records = []
+    for line in file.read().split("\n"):
+        if line == '':
+            continue
+        variants = []
+        for variant in line.split("||")[1:]:
+            fields = variant.split("|")
+            source = fields[1] if len(fields) > 1 else ""
+            variants.append(LevelPack.FIELD_SEP.join([source]+fields[0].split()))
+        if len(variants) == 0:
+            print(line)
+            continue
+        records.append(LevelPack.RECORD_SEP.join(variants).encode("utf-8"))
+    file.close()
+
+    # header, index, then the records
+    info = os.stat(script)
+    data = [LevelPack.HEADER.pack(LevelPack.MAGIC, LevelPack.VERSION, len(records), info.st_mtime, info.st_size)]
+    offset = LevelPack.HEADER.size+LevelPack.ENTRY.size*len(records)
+    for record in records:
+        data.append(LevelPack.ENTRY.pack(offset, len(record)))
+        offset += len(record)
+
+    # write beside the pack and swap it in so a reader never sees half a pack
+    handle, temporary = tempfile.mkstemp(".tmp", os.path.basename(pack)+".", os.path.dirname(os.path.abspath(pack)))
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(b"".join(data+records))
+        os.replace(temporary, pack)
+    except OSError:
+        os.remove(temporary)
+        raise
+
+def load_level_pack(script="word_script.txt"):
+    '''load_level_pack(script="word_script.txt") -> LevelPack
+    returns the level pack for script, compiling it if it is missing or stale'''
+    pack = os.path.splitext(script)[0]+".pack"
+    info = os.stat(script)
+    try:
+        levels = LevelPack(pack)
+        if levels.sourceTime == info.st_mtime and levels.sourceSize == info.st_size:
+            return levels
+        levels.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    try:
+        compile_level_pack(script, pack)
+    except OSError:
+        # not allowed to write next to the script
+        pack = os.path.join(tempfile.gettempdir(), os.path.basename(pack))
+        compile_level_pack(script, pack)
+    return LevelPack(pack)
+
+class AliasTable:
+    '''picks indices in proportion to their weights in constant time with
+    Vose's alias method, after building in time linear in the weights'''
+
+    def __init__(self, weights):
+        '''AliasTable(weights) -> AliasTable
+        constructs the table for the positive weights'''
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight*count/total for weight in weights]
+        self.probability = array.array("d", [1])*count
+        self.alias = array.array("l", range(count))
+
+        # pair each index below the mean with one above to fill its column
+        small = [index for index in range(count) if scaled[index] < 1]
+        large = [index for index in range(count) if scaled[index] >= 1]
+        while len(small) > 0 and len(large) > 0:
+            less = small.pop()
+            more = large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less]-1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def __len__(self):
+        '''len(AliasTable) -> int
+        returns the number of weights'''
+        return len(self.alias)
+
+    def sample(self, random=random):
+        '''AliasTable.sample(random=random) -> int
+        returns an index picked by random in proportion to its weight'''
+        index = random.randrange(len(self.alias))
+        if random.random() < self.probability[index]:
+            return index
+        return self.alias[index]
+
+class PracticeIndex:
+    '''generates practice levels from a list of words, grouped by length and
+    weighted by how common each word is and how often the player misses the
+    word and its letter pairs'''
+
+    MISS_WEIGHT = 4
+    SPREAD = 2
+
+    def __init__(self, words, missRates=None):
+        '''PracticeIndex(words, missRates=None) -> PracticeIndex
+        constructs the index of words, where missRates gives the fraction of
+        times the player missed a word'''
+        missRates = missRates or {}
+        counts = collections.Counter(words)
+        if len(counts) == 0:
+            raise ValueError("no words to practice with")
+
+        # how often the player misses each letter pair
+        pairs = {}
+        for word, rate in missRates.items():
+            for pair in self.get_pairs(word):
+                pairs.setdefault(pair, []).append(rate)
+        pairRates = {pair: sum(rates)/len(rates) for pair, rates in pairs.items()}
+
+        # one table of words for each length
+        self.words = {}
+        self.tables = {}
+        byLength = {}
+        for word, count in counts.items():
+            pairMiss = [pairRates.get(pair, 0) for pair in self.get_pairs(word)]
+            miss = missRates.get(word, 0)+(sum(pairMiss)/len(pairMiss) if pairMiss else 0)
+            byLength.setdefault(len(word), []).append((word, count*(1+self.MISS_WEIGHT*miss)))
+        for length, weighted in byLength.items():
+            self.words[length] = [word for word, weight in weighted]
+            self.tables[length] = AliasTable([weight for word, weight in weighted])
+        self.lengths = sorted(self.words)
+
+    def __len__(self):
+        '''len(PracticeIndex) -> int
+        returns the number of different words'''
+        return sum(len(words) for words in self.words.values())
+
+    @staticmethod
+    def get_pairs(word):
+        '''PracticeIndex.get_pairs(word) -> set
+        returns the pairs of letters next to each other in word'''
+        word = word.lower()
+        return {word[i:i+2] for i in range(len(word)-1)}
+
+    def generate(self, count, length, random=random):
+        '''PracticeIndex.generate(count, length, random=random) -> tuple
+        returns the (words, source) of a level of count words picked by random
+        with lengths around length'''
+        # lengths nearer the target are more likely
+        lengths = AliasTable([math.exp(-((size-length)/self.SPREAD)**2/2) for size in self.lengths])
+
+        words = []
+        for i in range(count):
+            size = self.lengths[lengths.sample(random)]
+            words.append(self.words[size][self.tables[size].sample(random)])
+        return words, "Practice"
+
+def read_word_list(file):
+    '''read_word_list(file) -> list
+    returns the words of file separated by whitespace'''
+    with open(file, encoding="utf-8") as stream:
+        return stream.read().split()
+
+class FrameStats:
+    '''measures frame times and the time spent in each subsystem'''
+
+    def __init__(self, size=300):
+        '''FrameStats(size=300) -> FrameStats
+        constructs stats over the last size frames'''
+        self.size = size
+        self.frameTimes = collections.deque(maxlen=size)
+        self.intervals = collections.deque(maxlen=size)
+        self.subsystems = {}
+        self.current = {}
+        self.frameStart = None
+        self.frames = 0
+
+    def begin_frame(self):
+        '''FrameStats.begin_frame() -> None
+        starts measuring a frame'''
+        now = time.perf_counter()
+        if self.frameStart != None:
+            self.intervals.append(now-self.frameStart)
+        self.frameStart = now
+        self.current = {}
+
+    def end_frame(self):
+        '''FrameStats.end_frame() -> None
+        stops measuring the frame'''
+        self.frameTimes.append(time.perf_counter()-self.frameStart)
+        for name in self.current:
+            if name not in self.subsystems:
+                self.subsystems[name] = collections.deque(maxlen=self.size)
+        for name in self.subsystems:
+            self.subsystems[name].append(self.current.get(name, 0))
+        self.frames += 1
+
+    def measure(self, name, function, *args):
+        '''FrameStats.measure(name, function, *args) -> object
+        calls function and adds the cpu time of this thread to the subsystem name'''
+        start = time.thread_time()
+        result = function(*args)
+        self.current[name] = self.current.get(name, 0)+time.thread_time()-start
+        return result
+
+    def get_fps(self):
+        '''FrameStats.get_fps() -> float
+        returns the measured frames per second'''
+        try:
+            return len(self.intervals)/sum(self.intervals)
+        except ZeroDivisionError:
+            return 0
+
+    def get_percentile(self, percent):
+        '''FrameStats.get_percentile(percent) -> float
+        returns the frame time in seconds below which percent of frames fall'''
+        if len(self.frameTimes) == 0:
+            return 0
+        frameTimes = sorted(self.frameTimes)
+        return frameTimes[int(percent/100*(len(frameTimes)-1))]
+
+    def get_subsystem_times(self):
+        '''FrameStats.get_subsystem_times() -> dict
+        returns the average cpu seconds per frame of each subsystem'''
+        return {name: sum(times)/len(times) for name, times in self.subsystems.items()}
+
+    def get_stats(self):
+        '''FrameStats.get_stats() -> dict
+        returns the fps, frame time percentiles in ms and subsystem ms'''
+        return {"frames": self.frames, "fps": self.get_fps(),
+            "p50": self.get_percentile(50)*1000, "p95": self.get_percentile(95)*1000,
+            "p99": self.get_percentile(99)*1000,
+            "subsystems": {name: seconds*1000 for name, seconds in self.get_subsystem_times().items()}}
+
+class PerformanceHud(pygame.Surface):
+    '''an overlay with the fps, a graph of frame times and the ms of each subsystem'''
+
+    def __init__(self, game, pos, every=15):
+        '''PerformanceHud(game, pos, every=15) -> PerformanceHud
+        constructs a hidden overlay for game at pos, redrawn every every frames'''
+        pygame.Surface.__init__(self, (260,150), SRCALPHA)
+        self.game = game
+        self.pos = pos
+        self.every = every
+        self.shown = False
+        self.frames = 0
+        self.font = fontRegistry.get("courier new", 13)
+
+    def is_shown(self):
+        '''PerformanceHud.is_shown() -> bool
+        returns whether the overlay is shown'''
+        return self.shown
+
+    def toggle(self):
+        '''PerformanceHud.toggle() -> None
+        shows or hides the overlay'''
+        self.shown = not self.shown
+        self.frames = 0
+
+    def draw(self):
+        '''PerformanceHud.draw() -> None
+        draws the current stats on the overlay'''
+        stats = self.game.get_stats()
+        self.fill((0,0,0,170))
+        text = f"{stats.get_fps():5.1f} fps  p95 {stats.get_percentile(95)*1000:5.2f} ms"
+        self.blit(self.font.render(text, True, (255,255,255)), (5, 3))
+
+        # frame times, with a line at the time a frame has at 60 fps
+        graph = pygame.Rect(5, 20, 250, 40)
+        pygame.draw.rect(self, (255,255,255), graph, 1)
+        scale = graph.height/(2/60)
+        pygame.draw.line(self, (255,200,0), (graph.left, graph.bottom-scale/60), (graph.right-1, graph.bottom-scale/60))
+        frameTimes = list(stats.frameTimes)[-(graph.width-2):]
+        for x, seconds in enumerate(frameTimes):
+            height = min(seconds*scale, graph.height-2)
+            pygame.draw.line(self, (0,162,232), (graph.left+1+x, graph.bottom-2), (graph.left+1+x, graph.bottom-2-height))
+
+        # the slowest subsystems first
+        y = 64
+        subsystems = stats.get_subsystem_times()
+        for name in sorted(subsystems, key=subsystems.get, reverse=True)[:6]:
+            self.blit(self.font.render(name, True, (255,255,255)), (5, y))
+            value = self.font.render(f"{subsystems[name]*1000:.2f} ms", True, (255,255,255))
+            self.blit(value, (255-value.get_width(), y))
+            y += 14
+
+    def update(self):
+        '''PerformanceHud.update() -> None
+        draws the overlay if it is shown'''
+        if not self.shown:
+            return
+
+        changed = self.frames%self.every == 0
+        if changed:
+            self.draw()
+        self.frames += 1
+        self.game.get_renderer().blit(self, self.pos, changed)
+
+class FrameProfiler:
+    '''profiles a window of frames with cProfile and dumps the stats to a file'''
+
+    def __init__(self):
+        '''FrameProfiler() -> FrameProfiler
+        constructs a profiler that is not running'''
+        self.profile = None
+        self.frames = 0
+        self.file = None
+
+    def is_running(self):
+        '''FrameProfiler.is_running() -> bool
+        returns whether frames are being profiled'''
+        return self.profile != None
+
+    def start(self, frames, file):
+        '''FrameProfiler.start(frames, file) -> None
+        profiles the next frames frames and dumps the stats to file,
+        which pstats or snakeviz can read'''
+        if self.profile != None:
+            return
+        self.frames = frames
+        self.file = file
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def end_frame(self):
+        '''FrameProfiler.end_frame() -> None
+        counts a profiled frame and dumps the stats after the last one'''
+        if self.profile == None:
+            return
+        self.frames -= 1
+        if self.frames <= 0:
+            self.stop()
+
+    def stop(self):
+        '''FrameProfiler.stop() -> None
+        stops profiling and dumps the stats of the frames so far'''
+        if self.profile == None:
+            return
+        self.profile.disable()
+        self.profile.dump_stats(self.file)
+        self.profile = None
+
+class EventLog:
+    '''an append-only log of what happens in a session, written in batches
+    by its own thread so that logging costs the game loop one list append
+
+    each event has the monotonic time of its frame, its kind and the fields
+    of its kind in FIELDS, as a json line or as a binary record of struct
+    RECORD followed by the fields joined by \\x1f'''
+
+    RECORD = struct.Struct("<dBH")
+    FIELDS = {"session": ("action",),
+        "key": ("key", "text"),
+        "match": ("word", "seconds"),
+        "miss": ("typed",),
+        "lost": ("word",),
+        "level": ("levelNum", "correct", "total", "seconds", "completed")}
+    KINDS = tuple(FIELDS)
+
+    def __init__(self, file=None, binary=None, batch=256):
+        '''EventLog(file=None, binary=None, batch=256) -> EventLog
+        constructs a log appending to file, binary if file ends in .bin unless
+        binary says otherwise, handing events to the writer batch at a time
+        events are dropped if file is None'''
+        self.file = file
+        self.binary = binary if binary != None else str(file).endswith(".bin")
+        self.batch = batch
+        self.buffer = []
+        self.written = 0
+        if file == None:
+            return
+
+        self.stream = open(file, "ab")
+        self.batches = queue.Queue()
+        self.writer = threading.Thread(target=self.write, name="EventLog", daemon=True)
+        self.writer.start()
+        self.log("session", "start")
+
+    def is_enabled(self):
+        '''EventLog.is_enabled() -> bool
+        returns whether events are kept'''
+        return self.file != None
+
+    def log(self, kind, *fields):
+        '''EventLog.log(kind, *fields) -> None
+        adds an event of kind with the fields of kind in FIELDS'''
+        if self.file == None:
+            return
+        self.buffer.append((gameClock.get_real_time(), kind, fields))
+        if len(self.buffer) >= self.batch:
+            self.flush()
+
+    def flush(self):
+        '''EventLog.flush() -> None
+        hands the buffered events to the writer'''
+        if len(self.buffer) > 0:
+            self.batches.put(self.buffer)
+            self.buffer = []
+
+    def close(self):
+        '''EventLog.close() -> None
+        writes the remaining events and closes the file'''
+        if self.file == None:
+            return
+        self.log("session", "end")
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+        self.stream.close()
+        self.file = None
+
+    def encode(self, event):
+        '''EventLog.encode(event) -> bytes
+        returns event as a json line or binary record'''
+        now, kind, fields = event
+        if self.binary:
+            data = "\x1f".join(str(field) for field in fields).encode("utf-8")
+            return self.RECORD.pack(now, self.KINDS.index(kind), len(data))+data
+
+        record = {"time": now, "kind": kind}
+        record.update(zip(self.FIELDS[kind], fields))
+        return (json.dumps(record)+"\n").encode("utf-8")
+
+    def write(self):
+        '''EventLog.write() -> None
+        writes batches until the log is closed, runs on the writer thread'''
+        while True:
+            events = self.batches.get()
+            if events == None:
+                return
+            self.stream.write(b"".join(self.encode(event) for event in events))
+            self.stream.flush()
+            self.written += len(events)
+
+def read_event_log(file):
+    '''read_event_log(file) -> generator
+    yields the events of a log written by EventLog as dicts, with the
+    fields of binary logs as strings'''
+    stream = open(file, "rb")
+    if not file.endswith(".bin"):
+        for line in stream:
+            yield json.loads(line)
+        stream.close()
+        return
+
+    data = stream.read()
+    stream.close()
+    offset = 0
+    while offset < len(data):
+        now, kind, size = EventLog.RECORD.unpack_from(data, offset)
+        offset += EventLog.RECORD.size
+        kind = EventLog.KINDS[kind]
+        fields = data[offset:offset+size].decode("utf-8").split("\x1f") if size > 0 else [""]
+        offset += size
+        record = {"time": now, "kind": kind}
+        record.update(zip(EventLog.FIELDS[kind], fields))
+        yield record
+
+class ProfileStore:
+    '''keeps the sessions, level results and word counts of a player in a
+    sqlite database, written in batches by its own thread'''
+
+    SCHEMA = """
+        create table if not exists sessions (id text primary key, player text, started real,
+            ended real, words integer default 0, seconds real default 0);
+        create table if not exists levels (session text, player text, level integer,
+            correct integer, total integer, seconds real, wpm real, completed integer,
+            mode text default 'script');
+        create table if not exists words (player text, word text, typed integer, missed integer,
+            primary key (player, word));
+        create table if not exists bests (player text, level integer, wpm real,
+            primary key (player, level));
+        create index if not exists levels_player on levels (player, level);
+        create index if not exists words_missed on words (player, missed);
+        create index if not exists sessions_player on sessions (player);"""
+
+    def __init__(self, file=None, player="player"):
+        '''ProfileStore(file=None, player="player") -> ProfileStore
+        constructs the store of player in the database file, or one that
+        keeps nothing if file is None'''
+        self.file = file
+        self.player = player
+        self.session = None
+        self.words = {}
+        if file == None:
+            return
+
+        connection = sqlite3.connect(file)
+        connection.execute("pragma journal_mode=wal")
+        connection.executescript(self.SCHEMA)
+        # databases from before practice levels
+        if "mode" not in [column[1] for column in connection.execute("pragma table_info(levels)")]:
+            connection.execute("alter table levels add column mode text default 'script'")
+        connection.close()
+        self.reader = None
+        self.batches = queue.Queue()
+        self.writer = threading.Thread(target=self.write, name="ProfileStore", daemon=True)
+        self.writer.start()
+
+    def is_enabled(self):
+        '''ProfileStore.is_enabled() -> bool
+        returns whether anything is kept'''
+        return self.file != None
+
+    def start_session(self):
+        '''ProfileStore.start_session() -> None
+        ends the current session and starts a new one'''
+        if self.file == None:
+            return
+        self.end_session()
+        self.session = uuid.uuid4().hex
+        self.batches.put([("insert into sessions (id, player, started) values (?, ?, ?)",
+            (self.session, self.player, time.time()))])
+
+    def end_session(self):
+        '''ProfileStore.end_session() -> None
+        marks the current session as ended and writes what is left of it'''
+        if self.file == None or self.session == None:
+            return
+        self.flush([("update sessions set ended = ? where id = ?", (time.time(), self.session))])
+        self.session = None
+
+    def add_word(self, word, typed):
+        '''ProfileStore.add_word(word, typed) -> None
+        counts word as typed, or missed if typed is False'''
+        if self.file == None:
+            return
+        counts = self.words.setdefault(word, [0, 0])
+        counts[0 if typed else 1] += 1
+
+    def add_level(self, levelNum, correct, total, seconds, completed, mode="script"):
+        '''ProfileStore.add_level(levelNum, correct, total, seconds, completed, mode="script") -> None
+        writes the result of a level with the words counted since the last one
+        mode is "practice" for practice levels, which do not count as bests'''
+        if self.file == None or self.session == None:
+            return
+        wpm = correct*60/seconds if seconds > 0 else 0
+        statements = [
+            ("insert into levels values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.session, self.player, levelNum, correct, total, seconds, wpm, completed, mode)),
+            ("update sessions set words = words+?, seconds = seconds+? where id = ?",
+                (correct, seconds, self.session))]
+
+        # bests are kept as they change so they are read without a scan
+        if completed and mode == "script":
+            statements.append(("insert into bests values (?, ?, ?) on conflict (player, level) do update "
+                "set wpm = max(wpm, excluded.wpm)", (self.player, levelNum, wpm)))
+        self.flush(statements)
+
+    def flush(self, statements=()):
+        '''ProfileStore.flush(statements=()) -> None
+        hands statements and the word counts to the writer as one batch'''
+        batch = list(statements)
+        for word, (typed, missed) in self.words.items():
+            batch.append(("insert into words values (?, ?, ?, ?) on conflict (player, word) do update "
+                "set typed = typed+excluded.typed, missed = missed+excluded.missed",
+                (self.player, word, typed, missed)))
+        self.words = {}
+        if len(batch) > 0:
+            self.batches.put(batch)
+
+    def close(self):
+        '''ProfileStore.close() -> None
+        writes everything left and closes the database'''
+        if self.file == None:
+            return
+        self.end_session()
+        self.batches.put(None)
+        self.writer.join()
+        if self.reader != None:
+            self.reader.close()
+        self.file = None
+
+    def write(self):
+        '''ProfileStore.write() -> None
+        writes batches in one transaction each until the store is closed,
+        runs on the writer thread'''
+        connection = sqlite3.connect(self.file)
+        while True:
+            batch = self.batches.get()
+            if batch == None:
+                break
+            with connection:
+                for statement, parameters in batch:
+                    connection.execute(statement, parameters)
+        connection.close()
+
+    def query(self, statement, parameters=()):
+        '''ProfileStore.query(statement, parameters=()) -> list
+        returns the rows of statement, which sees the batches written so far'''
+        if self.file == None:
+            return []
+        if self.reader == None:
+            self.reader = sqlite3.connect(self.file)
+        return self.reader.execute(statement, parameters).fetchall()
+
+    def get_best_wpm(self):
+        '''ProfileStore.get_best_wpm() -> dict
+        returns the player's best words per minute on each completed level'''
+        return dict(self.query("select level, wpm from bests where player = ?", (self.player,)))
+
+    def get_most_missed(self, count=10):
+        '''ProfileStore.get_most_missed(count=10) -> list
+        returns (word, missed, typed) for the count words the player missed most'''
+        return self.query("select word, missed, typed from words where player = ? and missed > 0 "
+            "order by missed desc limit ?", (self.player, count))
+
+    def get_miss_rates(self):
+        '''ProfileStore.get_miss_rates() -> dict
+        returns the fraction of times the player missed each word'''
+        return {word: missed/(typed+missed) for word, typed, missed in
+            self.query("select word, typed, missed from words where player = ?", (self.player,))}
+
+    def get_avg_wpm(self):
+        '''ProfileStore.get_avg_wpm() -> float
+        returns the player's words per minute over every session'''
+        rows = self.query("select sum(words), sum(seconds) from sessions where player = ?", (self.player,))
+        if len(rows) == 0 or not rows[0][1]:
+            return 0
+        return int(rows[0][0]*60/rows[0][1]*10)/10
+
+class Recorder:
+    '''records the clock readings, events of every frame and values read from
+    outside the game during a session so that Replay can play it again exactly'''
+
+    def __init__(self, seed=None, source=time.perf_counter):
+        '''Recorder(seed=None, source=time.perf_counter) -> Recorder
+        constructs a recorder of a session seeded with seed, or a random
+        seed, reading the time from source()'''
+        self.seed = seed if seed != None else random.getrandbits(32)
+        self.source = source
+        self.times = []
+        self.frames = []
+        self.reads = []
+
+    def time(self):
+        '''Recorder.time() -> float
+        reads and records the time, the game clock's source while recording'''
+        now = self.source()
+        self.times.append(now)
+        return now
+
+    def get_frame(self):
+        '''Recorder.get_frame() -> list
+        returns and records the events of this frame'''
+        events = pygame.event.get()
+
+        # only the attributes that can be written out
+        frame = []
+        for event in events:
+            attributes = {}
+            for name, value in event.dict.items():
+                if isinstance(value, tuple):
+                    value = list(value)
+                if value == None or isinstance(value, (int, float, str, list)):
+                    attributes[name] = value
+            frame.append([event.type, attributes])
+        self.frames.append(frame)
+        return events
+
+    def read(self, name, function):
+        '''Recorder.read(name, function) -> object
+        returns and records function(), a value named name from outside the game'''
+        value = function()
+        self.reads.append([name, value])
+        return value
+
+    def save(self, file):
+        '''Recorder.save(file) -> None
+        writes the recording to file'''
+        with open(file, "w") as stream:
+            json.dump({"seed": self.seed, "times": self.times, "frames": self.frames, "reads": self.reads}, stream)
+
+class Replay:
+    '''plays back a session written by Recorder.save'''
+
+    def __init__(self, file):
+        '''Replay(file) -> Replay
+        constructs a replay of the recording file'''
+        with open(file) as stream:
+            recording = json.load(stream)
+        self.seed = recording["seed"]
+        self.times = recording["times"]
+        self.frames = recording["frames"]
+        self.reads = recording.get("reads", [])
+        self.timeIndex = 0
+        self.frameIndex = 0
+        self.readIndex = 0
+
+    def __len__(self):
+        '''len(Replay) -> int
+        returns the number of frames recorded'''
+        return len(self.frames)
+
+    def is_finished(self):
+        '''Replay.is_finished() -> bool
+        returns whether every recorded frame was played'''
+        return self.frameIndex == len(self.frames)
+
+    def time(self):
+        '''Replay.time() -> float
+        returns the next recorded time, the game clock's source while replaying'''
+        now = self.times[min(self.timeIndex, len(self.times)-1)]
+        self.timeIndex += 1
+        return now
+
+    def get_frame(self):
+        '''Replay.get_frame() -> list
+        returns the recorded events of the next frame'''
+        if self.is_finished():
+            return []
+        frame = self.frames[self.frameIndex]
+        self.frameIndex += 1
+
+        events = []
+        for eventType, attributes in frame:
+            for name, value in attributes.items():
+                if isinstance(value, list):
+                    attributes[name] = tuple(value)
+            events.append(pygame.event.Event(eventType, attributes))
+        return events
+
+    def read(self, name, function):
+        '''Replay.read(name, function) -> object
+        returns the next recorded value named name instead of calling function,
+        which is only called for recordings made before values were recorded'''
+        if self.readIndex == len(self.reads):
+            return function()
+        recorded, value = self.reads[self.readIndex]
+        if recorded != name:
+            raise ValueError(f"replay read {name} but {recorded} was recorded")
+        self.readIndex += 1
+        return value
+
+class BottleStore:
+    '''keeps the state of all bottles of a level in flat arrays
+
+    bottles come into view in order and all move at the same speed, so the
+    bottles in view are always the range from first up to next'''
+
+    WAITING = 0
+    IN_VIEW = 1
+    GONE = 2
+
+    def __init__(self):
+        '''BottleStore() -> BottleStore
+        constructs an empty store'''
+        self.clear()
+
+    def __len__(self):
+        '''len(BottleStore) -> int
+        returns the number of bottles'''
+        return len(self.bottles)
+
+    def __iter__(self):
+        '''iter(BottleStore) -> iterator
+        iterates over the bottles in order'''
+        return iter(self.bottles)
+
+    def __getitem__(self, index):
+        '''BottleStore[index] -> Bottle
+        returns the bottle or list of bottles at index'''
+        return self.bottles[index]
+
+    def clear(self):
+        '''BottleStore.clear() -> None
+        removes all bottles'''
+        self.bottles = []
+        self.x = array.array("d")
+        self.y = array.array("d")
+        self.image = array.array("b")
+        self.entered = array.array("d")
+        self.state = array.array("b")
+        self.highlight = array.array("h")
+        self.removed = array.array("h")
+        self.watch = Stopwatch()
+        self.speed = 0
+        self.lastStep = 0
+        self.first = 0
+        self.next = 0
+        self.withWord = 0
+        self.correct = 0
+
+    def add(self, bottle, y, image=1):
+        '''BottleStore.add(bottle, y, image=1) -> int
+        adds bottle waiting off screen at height y drawn with bottle image image
+        and returns its index, bottle can be None until the Bottle is made'''
+        self.bottles.append(bottle)
+        self.x.append(1400)
+        self.y.append(y)
+        self.image.append(image)
+        self.entered.append(0)
+        self.state.append(self.WAITING)
+        self.highlight.append(0)
+        self.removed.append(0)
+        return len(self.bottles)-1
+
+    def count_in_view(self):
+        '''BottleStore.count_in_view() -> int
+        returns the number of bottles in view'''
+        return self.next-self.first
+
+    def count_in_view_with_word(self):
+        '''BottleStore.count_in_view_with_word() -> int
+        returns the number of bottles in view that still have their word'''
+        return self.withWord
+
+    def count_waiting(self):
+        '''BottleStore.count_waiting() -> int
+        returns the number of bottles that have not come into view yet'''
+        return len(self.bottles)-self.next
+
+    def get_correct(self):
+        '''BottleStore.get_correct() -> int
+        returns the number of bottles whose word was typed'''
+        return self.correct
+
+    def get_in_view(self):
+        '''BottleStore.get_in_view() -> list
+        returns the bottles in view'''
+        return self.bottles[self.first:self.next]
+
+    def get_next(self):
+        '''BottleStore.get_next() -> Bottle
+        returns the next bottle to come into view or None'''
+        if self.next == len(self.bottles):
+            return None
+        return self.bottles[self.next]
+
+    def move_in_view(self):
+        '''BottleStore.move_in_view() -> Bottle
+        moves the next bottle in view and returns it'''
+        index = self.next
+        self.x[index] = 1170
+        self.entered[index] = self.watch.get_time()
+        self.state[index] = self.IN_VIEW
+        self.next += 1
+        self.withWord += 1
+        return self.bottles[index]
+
+    def collect(self, index):
+        '''BottleStore.collect(index) -> None
+        starts removing the word of the bottle at index'''
+        self.removed[index] = 1
+        self.withWord -= 1
+        self.correct += 1
+
+    def set_speed(self, speed):
+        '''BottleStore.set_speed(speed) -> None
+        makes the bottles move speed pixels a second from now on'''
+        self.speed = speed
+
+    def play(self):
+        '''BottleStore.play() -> None
+        lets the bottles move'''
+        self.watch.play()
+
+    def pause(self):
+        '''BottleStore.pause() -> None
+        stops the bottles'''
+        self.watch.pause()
+
+    def step(self):
+        '''BottleStore.step() -> list
+        moves the bottles in view and fades collected words by one tick
+        returns the bottles that left the view with their word'''
+        if not self.watch.is_running():
+            return []
+
+        # the speed can change, so move by the time since the last step
+        speed = self.speed
+        now = self.watch.get_time()
+        last = self.lastStep
+        self.lastStep = now
+        x = self.x
+        entered = self.entered
+        removed = self.removed
+        for index in range(self.first, self.next):
+            x[index] -= speed*(now-max(entered[index], last))
+            if 0 < removed[index] < 101:
+                removed[index] += 1
+
+        # bottles leave in the order they came in
+        missed = []
+        while self.first < self.next and x[self.first] <= -120:
+            self.state[self.first] = self.GONE
+            if removed[self.first] == 0:
+                self.withWord -= 1
+                missed.append(self.bottles[self.first])
+            self.first += 1
+        return missed
+
+class Pacer:
+    '''sets how often bottles come and how fast they move from the time the
+    player took for each of the last words
+
+    the pace is the words per minute over a rolling window of word times,
+    plus a few words at the level's starting pace so that it moves smoothly
+    from there, and keeps as many words in view as the level always had, but
+    at least two so that a word can be read before it has to be typed
+    missed words count as taking MISSED times as long as they were in view'''
+
+    PRIOR = 5
+    MISSED = 2
+    MIN_WPM = 10
+    MAX_WPM = 200
+
+    def __init__(self, window=20):
+        '''Pacer(window=20) -> Pacer
+        constructs a pacer over the last window words'''
+        self.times = collections.deque(maxlen=window)
+        self.total = 0
+        self.start_level(10, 0)
+
+    def start_level(self, words, wpm):
+        '''Pacer.start_level(words, wpm) -> None
+        starts pacing a level of words words from wpm, or the number of words if faster'''
+        self.startWpm = max(words, wpm, self.MIN_WPM)
+        self.inView = max(words//10, 2)
+        self.last = None
+        self.update()
+
+    def resolve(self, entered, now, typed):
+        '''Pacer.resolve(entered, now, typed) -> None
+        adds the word that came in view at entered and was typed, or left
+        the view if not typed, at now, both in the level's bottle time'''
+        # typing a word starts when it came or the last word was typed
+        if not typed:
+            seconds = (now-entered)*self.MISSED
+        elif self.last != None:
+            seconds = now-max(entered, self.last)
+        else:
+            seconds = now-entered
+        if typed:
+            self.last = now
+
+        if len(self.times) == self.times.maxlen:
+            self.total -= self.times[0]
+        self.times.append(seconds)
+        self.total += seconds
+        self.update()
+
+    def update(self):
+        '''Pacer.update() -> None
+        sets the pace from the word times'''
+        wpm = 60*(len(self.times)+self.PRIOR)/(self.total+self.PRIOR*60/self.startWpm)
+        self.wpm = min(max(wpm, self.MIN_WPM), self.MAX_WPM)
+        self.interval = 60/(self.wpm+self.wpm/10-1)
+        self.speed = 1250/(self.inView*self.interval)
+
+    def get_wpm(self):
+        '''Pacer.get_wpm() -> float
+        returns the words per minute bottles come at'''
+        return self.wpm
+
+    def get_interval(self):
+        '''Pacer.get_interval() -> float
+        returns the seconds between bottles'''
+        return self.interval
+
+    def get_speed(self):
+        '''Pacer.get_speed() -> float
+        returns the pixels a second bottles move'''
+        return self.speed
+
 class Bottle:
-    '''represents a word on the screen'''
+    '''represents a word on the screen, with its state kept in the game's BottleStore'''
 
-    def __init__(self, game, word):
-        '''Bottle(game, word, wpm=0) -> Bottle
-        sets up a bottle for game with word'''
+    def __init__(self, game, word, store=None, random=None, index=None):
+        '''Bottle(game, word, store=None, random=None, index=None) -> Bottle
+        sets up a bottle for game with word in store, by default the game's,
+        placed by random, by default the game's, or at index where the
+        loader already placed it in store'''
         self.game = game
-        self.image = pygame.image.load(f"bottle{random.randint(1,3)}.png")
-        self.pos = (1400,random.randint(50,250))
-        self.font = pygame.font.SysFont("times new roman", 30, bold=True)
+        self.store = store if store != None else game.get_bottles()
+        if index == None:
+            if random == None:
+                random = game.get_random()
+            image = random.randint(1,3)
+            index = self.store.add(self, random.randint(50,250), image)
+        else:
+            self.store.bottles[index] = self
+        self.index = index
+        self.image = assetCache.load(f"bottle{self.store.image[index]}.png")
+        self.font = fontRegistry.get("times new roman", 30, bold=True)
         self.word = word
-        self.speed = 1
-        self.highlight = 0
-        self.start = None
-        self.paused = False
         self.missed = False
-        self.saved = 0
-        self.pause()
         
         # attributes for removing word
-        self.removed = 0
         self.wordColors = ((255,200,0), (0,162,232))
+        self.sprites = {}
+        self.fadeStrip = None
 
     def __str__(self):
         '''str(Bottle) -> str
         returns the bottle's word'''
         return self.word        
 
+    @property
+    def pos(self):
+        '''Bottle.pos -> tuple
+        the position of the bottle'''
+        return self.store.x[self.index], self.store.y[self.index]
+
+    @property
+    def highlight(self):
+        '''Bottle.highlight -> int
+        the number of highlighted letters'''
+        return self.store.highlight[self.index]
+
+    @property
+    def removed(self):
+        '''Bottle.removed -> int
+        0 while the bottle has its word, then the ticks of fading it out'''
+        return self.store.removed[self.index]
+
+    @removed.setter
+    def removed(self, removed):
+        self.store.removed[self.index] = removed
+
     def in_view(self):
         '''Bottle.in_view() -> bool
         returns if the bottle is in view or not'''
-        return -120 < self.pos[0] < 1171
+        return self.store.state[self.index] == BottleStore.IN_VIEW
 
     def used(self):
         '''Bottle.used() -> bool
         returns whether the bottle has been used'''
-        return self.pos[0] < 1171
+        return self.store.state[self.index] != BottleStore.WAITING
 
     def has_word(self):
         '''Bottle.has_word() -> bool
         returns whether bottle has word'''
         return self.removed == 0
 
-    def set_wpm(self):
-        '''Bottle.set_wpm() -> None
-        sets the bottle's wpm to player avg wpm'''
-        if self.game.get_avg_wpm() > len(self.game.get_bottles()):
-            self.wpm = self.game.get_avg_wpm()
-
-    def move_in_view(self):
-        '''Bottle.move_in_view() -> None
-        moves the bottle in view'''
-        self.start = time.time()
-        self.pos = 1170, self.pos[1]
-        self.saved = 0
-
-    def play(self):
-        '''Bottle.play() -> None
-        plays the bottle'''
-        if self.paused:
-            self.paused = False
-            self.start = time.time()
+    def set_highlight(self, highlight):
+        '''Bottle.set_highlight(highlight) -> None
+        sets the number of highlighted letters'''
+        self.store.highlight[self.index] = highlight
 
-    def pause(self):
-        '''Bottle.pause() -> None
-        pauses the bottle'''
-        if not self.paused:
-            self.paused = True
-            if self.start != None:
-                self.saved += time.time()-self.start
-        
     def match(self, word, leave=False):
         '''Bottle.match(word, leave=False) -> bool
         matches word to the bottle's word'''
@@ -86,59 +1534,192 @@ class Bottle:
             return
 
         if len(word) > len(self.word):
-            self.highlight = 0
+            self.set_highlight(0)
         elif self.word[:len(word)] == word:
-            self.highlight = len(word)
+            self.set_highlight(len(word))
         else:
-            self.highlight = 0
+            self.set_highlight(0)
             
         # check whole word
         if self.word == word and leave:
-            self.game.get_sounds()["reward"].play()
-            self.removed += 1
+            self.game.get_mixer().play("reward")
+            self.store.collect(self.index)
+            now = self.store.watch.get_time()
+            self.game.get_pacer().resolve(self.store.entered[self.index], now, True)
+            self.game.get_profile().add_word(self.word, True)
+            self.game.get_log().log("match", self.word, now-self.store.entered[self.index])
             return True
 
         return False
     
+    def get_sprite(self):
+        '''Bottle.get_sprite() -> tuple
+        returns the bottle with its word at the current highlight, premultiplied,
+        and where it is drawn from the bottle's position, composited once per highlight'''
+        highlight = self.highlight
+        if highlight in self.sprites:
+            return self.sprites[highlight]
+
+        strip = glyphCache.render_word(self.font, self.word, highlight, self.wordColors[0])
+        imageRect = self.image.get_rect()
+        stripRect = strip.get_rect(topleft=(imageRect.width/2-strip.get_width()/2, -10))
+        rect = imageRect.union(stripRect)
+
+        # premultiplied so the word blends over the bottle's clear pixels too
+        sprite = pygame.Surface(rect.size, SRCALPHA)
+        sprite.blit(self.image.premul_alpha(), (-rect.left, -rect.top), special_flags=BLEND_RGBA_ADD)
+        sprite.blit(strip.premul_alpha(), stripRect.move(-rect.left, -rect.top), special_flags=BLEND_PREMULTIPLIED)
+        self.sprites[highlight] = (sprite, rect.topleft)
+        return self.sprites[highlight]
+
     def draw_word(self):
         '''Bottle.draw_word() -> None
-        draws the word over the bottle'''
-        # create surfaces
-        width = 0
-        letters = []
-        for i in range(len(self.word)):
-            if self.removed > 1:
-                color = []
-                for j in range(3):
-                    color.append(self.wordColors[0][j]+self.removed*(self.wordColors[1][j]-self.wordColors[0][j])/100)
-                color = tuple(color)
-            elif i > self.highlight - 1:
-                color = (255,255,255)
-            else:
-                color = self.wordColors[0]
-                
-            letters.append(self.font.render(self.word[i], True, color))
-            width += letters[-1].get_rect().width
-
-        # blit surfaces
-        last = self.pos[0]-width/2+self.image.get_rect().width/2
-        for letter in letters:
-            self.game.get_screen().blit(letter, (last, self.pos[1]-10-15*self.removed/100))
-            last += letter.get_rect().width
+        draws the word over the bottle, fading it out after being matched'''
+        x, y = self.pos
+        removed = self.removed
+        if removed == 0:
+            strip = glyphCache.render_word(self.font, self.word, self.highlight, self.wordColors[0])
+        else:
+            # the bottle's own copy since its alpha changes every tick
+            if self.fadeStrip == None:
+                self.fadeStrip = glyphCache.render_word(self.font, self.word, len(self.word), self.wordColors[0]).copy()
+                self.sprites.clear()
+            strip = self.fadeStrip
+            strip.set_alpha(255-255*min(removed, 100)//100)
 
-        if self.removed and not self.paused:
-            self.removed += 1
+        self.game.get_renderer().blit(strip, (x-strip.get_width()/2+self.image.get_rect().width/2,
+            y-10-15*removed/100), removed > 0)
 
     def update(self):
         '''Bottle.update() -> None
-        updates the bottle'''
-        if not self.paused:
-            bottles = len(self.game.get_bottles())
-            self.pos = 1170-1250*(time.time()-self.start+self.saved)/(60*(bottles//10)/(bottles+bottles//10-1)), self.pos[1]
-            
-        self.game.get_screen().blit(self.image, self.pos)
+        draws the bottle in one blit while it has its word'''
+        x, y = self.pos
+        if self.removed == 0:
+            sprite, offset = self.get_sprite()
+            self.game.get_renderer().blit(sprite, (x+offset[0], y+offset[1]), flags=BLEND_PREMULTIPLIED)
+            return
+
+        self.game.get_renderer().blit(self.image, self.pos)
         if self.removed < 101:    self.draw_word()
 
+class WordMatcher:
+    '''matches the typed text against the bottles in view with a prefix trie'''
+
+    def __init__(self):
+        '''WordMatcher() -> WordMatcher
+        constructs an empty matcher'''
+        self.clear()
+
+    def clear(self):
+        '''WordMatcher.clear() -> None
+        removes all bottles from the matcher'''
+        self.root = self.new_node()
+        self.text = ""
+        self.path = [self.root]
+        self.highlighted = []
+
+    def new_node(self):
+        '''WordMatcher.new_node() -> dict
+        returns a trie node with its children, the bottles passing
+        through it and the bottles whose word ends at it'''
+        return {"next": {}, "through": [], "ends": []}
+
+    def find(self, word):
+        '''WordMatcher.find(word) -> dict
+        returns the node for word or None'''
+        node = self.root
+        for letter in word:
+            node = node["next"].get(letter)
+            if node == None:
+                return None
+        return node
+
+    def add(self, bottle):
+        '''WordMatcher.add(bottle) -> None
+        adds a bottle that came into view'''
+        node = self.root
+        node["through"].append(bottle)
+        for letter in str(bottle):
+            if letter not in node["next"]:
+                node["next"][letter] = self.new_node()
+            node = node["next"][letter]
+            node["through"].append(bottle)
+        node["ends"].append(bottle)
+
+        # the path may now reach further
+        self.path = [self.root]
+        self.walk(self.text)
+        if str(bottle).startswith(self.text):
+            bottle.set_highlight(len(self.text))
+            self.highlighted.append(bottle)
+
+    def remove(self, bottle):
+        '''WordMatcher.remove(bottle) -> None
+        removes a bottle that was matched or left the view'''
+        node = self.root
+        node["through"].remove(bottle)
+        for letter in str(bottle):
+            child = node["next"][letter]
+            child["through"].remove(bottle)
+            if len(child["through"]) == 0:
+                del node["next"][letter]
+                break
+            node = child
+        else:
+            node["ends"].remove(bottle)
+
+        if bottle in self.highlighted:
+            self.highlighted.remove(bottle)
+        self.path = [self.root]
+        self.walk(self.text)
+
+    def walk(self, text):
+        '''WordMatcher.walk(text) -> None
+        extends the path of matched nodes along text'''
+        while len(self.path) <= len(text):
+            node = self.path[-1]["next"].get(text[len(self.path)-1])
+            if node == None:
+                return
+            self.path.append(node)
+
+    def set_text(self, text):
+        '''WordMatcher.set_text(text) -> None
+        highlights the bottles starting with the typed text'''
+        if text == self.text:
+            return
+
+        # keep the nodes of the prefix shared with the old text
+        common = 0
+        while common < len(text) and common < len(self.text) and text[common] == self.text[common]:
+            common += 1
+        del self.path[common+1:]
+        self.text = text
+        self.walk(text)
+
+        # update only the bottles whose highlight changed
+        if len(self.path) == len(text)+1:
+            matched = self.path[-1]["through"]
+        else:
+            matched = []
+        for bottle in self.highlighted:
+            if bottle not in matched:
+                bottle.set_highlight(0)
+        for bottle in matched:
+            bottle.set_highlight(len(text))
+        self.highlighted = matched[:]
+
+    def submit(self, word):
+        '''WordMatcher.submit(word) -> Bottle
+        collects the first bottle in view with word and returns it or None'''
+        node = self.find(word)
+        if node == None or len(node["ends"]) == 0:
+            return None
+
+        bottle = node["ends"][0]
+        bottle.match(word, True)
+        self.remove(bottle)
+        return bottle
+
 class TextField(pygame.Surface):
     '''represents the text field'''
 
@@ -151,11 +1732,9 @@ class TextField(pygame.Surface):
 
         # text attribute
         self.text = ""
-        self.font = pygame.font.SysFont("times new roman", 26)
-        self.textSurface = self.font.render("", True, (0,0,0))
-        self.lastDelete = time.time()
-        self.keySound = Sound(game, "click2.wav", 0.07)
-        self.game.add_sound(self.keySound)
+        self.font = fontRegistry.get("times new roman", 26)
+        self.textSurface = textCache.render(self.font, "", (0,0,0))
+        self.drawn = None
         
         self.SAND = (245,213,170)
         self.fill(self.SAND)
@@ -168,9 +1747,8 @@ class TextField(pygame.Surface):
         for letter in range(ord("a"), ord("z")+1):
             self.keyMap[chr(letter)] = chr(letter).upper()
 
-        # turn everything into number
-        for letter in self.keyMap.copy():
-            self.keyMap[ord(letter)] = self.keyMap[letter]
+        # characters that can be typed
+        self.characters = set(self.keyMap) | set(self.keyMap.values())
                       
     def get(self):
         '''TextField.get() -> str
@@ -181,55 +1759,60 @@ class TextField(pygame.Surface):
         '''TextField.set(text) -> str
         sets the text to text'''
         self.text = text
-        self.textSurface = self.font.render(self.text, True, (0,0,0))
+        self.textSurface = textCache.render(self.font, self.text, (0,0,0))
+        self.game.get_matcher().set_text(self.text)
 
     def process_key(self, event):
-        '''TextField.process_key() -> None
-        processes the key press'''
-        # random characters
-        if self.textSurface.get_rect().width < 430 and event.key in self.keyMap:
-            self.keySound.play()
-            # capitalization
-            if pygame.key.get_pressed()[K_LSHIFT] or pygame.key.get_pressed()[K_RSHIFT]:
-                self.text += self.keyMap[event.key]
-            else:
-                self.text += chr(event.key)
+        '''TextField.process_key(event) -> None
+        processes a key down event, held keys repeat through pygame.key.set_repeat'''
+        # random characters, already shifted in the event's text
+        if event.unicode in self.characters and not event.mod & KMOD_CTRL:
+            if self.textSurface.get_rect().width >= 430:
+                return
+            self.game.get_mixer().play("key")
+            self.text += event.unicode
+            self.game.get_log().log("key", event.unicode, self.text)
 
         # space to submit
         elif event.key == K_SPACE or (event.key == K_RETURN and self.game.is_last_word()):
             if len(self.text) > 0:
-                self.keySound.play()
-            for bottle in self.game.get_bottles():
-                if bottle.in_view():
-                    if bottle.match(self.get(), True): break
-            self.set("")
-            
-        self.textSurface = self.font.render(self.text, True, (0,0,0))
+                self.game.get_mixer().play("key")
+            self.game.get_log().log("key", " ", self.text)
+            if self.game.get_matcher().submit(self.get()) == None and len(self.text) > 0:
+                self.game.get_log().log("miss", self.text)
+            self.text = ""
+
+        # delete a letter or with ctrl everything
+        elif event.key == K_BACKSPACE:
+            if len(self.text) == 0:
+                return
+            self.game.get_mixer().play("key")
+            if event.mod & KMOD_CTRL:
+                self.text = ""
+            else:
+                self.text = self.text[:-1]
+            self.game.get_log().log("key", "\b", self.text)
+
+        else:
+            return
+
+        self.set(self.text)
 
     def update(self):
         '''TextField.update() -> None
-        updates the text field'''
-        self.fill(self.SAND)
-        
-        # draw cursor
-        if time.time()%1.5 < 0.75 and not self.game.is_paused():
-            pygame.draw.line(self, (0,0,0), (self.textSurface.get_rect().width+10, 10),
-                (self.textSurface.get_rect().width+10, 30))
-
-        # delete
-        keys = pygame.key.get_pressed()
-        if not self.game.is_paused() and keys[K_BACKSPACE] and time.time() - self.lastDelete > 0.1:
-            if len(self.text) > 0:
-                self.keySound.play()
-            self.set(self.text[:-1])
-            self.lastDelete = time.time()
-        elif not self.game.is_paused() and (keys[K_RCTRL] or keys[K_LCTRL]) and keys[K_BACKSPACE]:
-            if len(self.text) > 0:
-                self.keySound.play()
-            self.set("")
-            
-        self.blit(self.textSurface, (10, 20-self.textSurface.get_rect().height/2))        
-        self.game.get_screen().blit(self, self.pos)
+        draws the text field'''
+        # only redraw when the text or cursor changed
+        cursor = gameClock.get_real_time()%1.5 < 0.75 and not self.game.is_paused()
+        changed = self.drawn != (self.textSurface, cursor)
+        if changed:
+            self.fill(self.SAND)
+            if cursor:
+                pygame.draw.line(self, (0,0,0), (self.textSurface.get_rect().width+10, 10),
+                    (self.textSurface.get_rect().width+10, 30))
+            self.blit(self.textSurface, (10, 20-self.textSurface.get_rect().height/2))
+            self.drawn = (self.textSurface, cursor)
+
+        self.game.get_renderer().blit(self, self.pos, changed)
 
 class Timer:
     '''manipulates a timer on the screen'''
@@ -240,11 +1823,9 @@ class Timer:
         self.timer = timer
         self.pos = pos
         self.game = game
-        self.started = False
-        self.startTime = None
+        self.watch = Stopwatch()
         self.currentTime = 0
-        self.savedTime = 0
-        self.font = pygame.font.SysFont("Arial", 35, bold=True)
+        self.font = fontRegistry.get("Arial", 35, bold=True)
 
     def is_finished(self):
         '''Timer.is_finished() -> bool
@@ -259,36 +1840,32 @@ class Timer:
     def pause(self):
         '''Timer.pause() -> None
         pauses the timer'''
-        self.started = False
-        self.savedTime = self.currentTime
+        self.watch.pause()
         
     def start(self):
         '''Timer.start() -> None
         starts the timer'''
-        self.started = True
-        self.startTime = time.time()
+        self.watch.play()
 
     def reset(self):
         '''Timer.reset() -> None
         resets the timer'''
-        self.savedTime = 0
+        self.watch = Stopwatch()
         self.currentTime = 0
-        self.started = False
+
+    def step(self):
+        '''Timer.step() -> None
+        advances the timer'''
+        self.currentTime = min(self.watch.get_time(), self.timer)
 
     def update(self):
         '''Timer.update() -> None
-        updates the timer'''
-        if self.started:
-            self.currentTime = time.time() - self.startTime + self.savedTime
-
-        if self.currentTime > self.timer:
-            self.currentTime = self.timer
-
-        # update text
-        color = (255,255,255)            
-        text = self.font.render(f"{int((self.timer-self.currentTime)//60)}:"+\
-            f"{str(int((self.timer-self.currentTime)%60)).zfill(2)}", True, color)
-        self.game.get_screen().blit(text, (self.pos[0]-text.get_rect().width/2, self.pos[1]))
+        draws the timer'''
+        # update text, which is only rendered once per second shown
+        color = (255,255,255)
+        text = textCache.render(self.font, f"{int((self.timer-self.currentTime)//60)}:"+\
+            f"{str(int((self.timer-self.currentTime)%60)).zfill(2)}", color)
+        self.game.get_renderer().blit(text, (self.pos[0]-text.get_rect().width/2, self.pos[1]))
 
 class Level:
     '''represents all the levels of the game'''
@@ -297,17 +1874,22 @@ class Level:
         '''Level(game) -> Level
         constructs an object for all levels'''
         self.game = game
-        self.levelSurface = pygame.image.load("level.png")
         self.levelNum = 1
+        self.line = None
+        self.lineNum = None
+        self.loading = None
+        self.nextLoading = None
+        self.prepared = None
         self.ended = False
         self.flyout = None
         self.gameOver = False
 
         # set up fonts
-        self.messageFont = pygame.font.SysFont("times new roman", 20)
-        self.levelCompleteFont = pygame.font.SysFont("times new roman", 40, bold=True)
-        self.statsFont = pygame.font.SysFont("times new roman", 25, bold=True)
-        self.sourceFont = pygame.font.SysFont("times new roman", 20, bold=True)
+        self.messageFont = fontRegistry.get("times new roman", 20)
+        self.levelCompleteFont = fontRegistry.get("times new roman", 40, bold=True)
+        self.statsFont = fontRegistry.get("times new roman", 25, bold=True)
+        self.sourceFont = fontRegistry.get("times new roman", 20, bold=True)
+        self.start_summary(assetCache.copy("level.png"))
 
     def is_ended(self):
         '''Level.is_ended() -> bool
@@ -321,13 +1903,13 @@ class Level:
             return
 
         if 525 < event.pos[0] < 675:
-            self.game.get_sounds()["button"].play()
+            self.game.get_mixer().play("button")
             self.redo_level()
         elif 685 < event.pos[0] < 835 and not self.missed:
-            self.game.get_sounds()["button"].play()
+            self.game.get_mixer().play("button")
             self.next_level()
         elif 365 < event.pos[0] < 515:
-            self.game.get_sounds()["button"].play()
+            self.game.get_mixer().play("button")
             self.game.show_popup("restart")
 
     def end_level(self):
@@ -335,37 +1917,14 @@ class Level:
         ends the level'''
         self.game.pause()
         self.ended = True
-        self.levelEndPos = [0, -400]
-
-        # process text and bottles
-        message = ""
-        self.missed = False
-        last = False
-        totalCorrect = 0
-        for bottle in self.game.get_bottles():
-            # word that is missed
-            if bottle.has_word():
-                self.missed = True
-                if not last:
-                    message += "... "
-                    last = True
-            # not missed
-            else:
-                message += str(bottle)+" "
-                last = False
-                totalCorrect += 1
+        self.slide = Tween((0, -400), (0, 0), 2/3, ease_out_cubic)
+        self.slide.play()
+        self.surfaceChanged = True
 
-        if totalCorrect/len(self.game.get_bottles()) >= 0.9:
-            self.missed = False
-
-        # add message to screen
-        ypos = 160; last = 0
-        for i in range(0, len(message), 140):
-            lastSpace = message.rfind(" ", i, i+140)
-            
-            line = self.messageFont.render(message[last:lastSpace], True, (255,255,255))
-            self.levelSurface.blit(line, (600-line.get_rect().width/2, ypos))
-            ypos += 20; last = lastSpace+1
+        # the words of the last bottles
+        self.summarize(True)
+        totalCorrect = self.game.get_bottles_correct()
+        self.missed = totalCorrect/len(self.game.get_bottles()) < 0.9
 
         # other text
         completed = f"Level {self.levelNum}: Completed!"
@@ -373,76 +1932,195 @@ class Level:
         if self.missed:
             completed = f"Level {self.levelNum}: Incomplete"
             nextLevel = "disabled"
-        text = self.levelCompleteFont.render(completed, True, (255,255,255))
+        text = textCache.render(self.levelCompleteFont, completed, (255,255,255))
         self.levelSurface.blit(text, (600-text.get_rect().width/2, 45))
 
-        # source for text
-        if len(self.game.get_lines()[self.levelNum-1].split("|")) > 1:
-            source = self.sourceFont.render(self.game.get_lines()[self.levelNum-1].split("|")[1], True, (255,255,255))
-            self.levelSurface.blit(source, (600-source.get_rect().width/2, 135))
-
-        # buttons on screen
-        self.levelSurface.blit(pygame.image.load("restart_button_2.png"), (365, 363))
-        self.levelSurface.blit(pygame.image.load("redo_level_button.png"), (525, 363))
-        self.levelSurface.blit(pygame.image.load(f"next_level_button_{nextLevel}.png"), (685, 363))
+        # buttons on screen, over long summaries
+        self.levelSurface.blit(assetCache.load("restart_button_2.png"), (365, 363))
+        self.levelSurface.blit(assetCache.load("redo_level_button.png"), (525, 363))
+        self.levelSurface.blit(assetCache.load(f"next_level_button_{nextLevel}.png"), (685, 363))
 
         # stats
         self.game.log_words(totalCorrect)
+        self.game.get_log().log("level", self.levelNum, totalCorrect, len(self.game.get_bottles()),
+            self.game.get_clock().get_time(), not self.missed)
+        mode = "script" if self.game.get_practice() == None else "practice"
+        self.game.get_profile().add_level(self.levelNum, totalCorrect, len(self.game.get_bottles()),
+            self.game.get_clock().get_time(), not self.missed, mode)
         wpm = self.statsFont.render("Words per minute: "+str(int((totalCorrect*60/\
             self.game.get_clock().get_time())*10)/10), True, (255,255,255))
         numWords = self.statsFont.render(f"Words correct: {totalCorrect}/{len(self.game.get_bottles())}", True, (255,255,255))
         self.levelSurface.blit(numWords, (400-numWords.get_rect().width/2, 100))
         self.levelSurface.blit(wpm, (800-wpm.get_rect().width/2, 100))
                 
-    def update(self):
-        '''Level.update() -> None
-        updates the level'''
+    def start_summary(self, surface):
+        '''Level.start_summary(surface) -> None
+        starts building the level end summary on surface'''
+        self.levelSurface = surface
+        self.summarized = 0
+        self.summaryText = ""
+        self.summaryStart = 0
+        self.summaryLines = 0
+        self.summaryMissed = False
+
+        # render the titles before they are needed
+        for completed in ("Completed!", "Incomplete"):
+            textCache.render(self.levelCompleteFont, f"Level {self.levelNum}: {completed}", (255,255,255))
+
+    def summarize(self, final=False):
+        '''Level.summarize(final=False) -> None
+        adds the words of the bottles resolved so far to the summary in order
+        and draws its finished lines, or all bottles and lines if final'''
+        bottles = self.game.get_bottles()
+        while self.summarized < len(bottles):
+            # a word is missed once its bottle is gone
+            missed = bottles.removed[self.summarized] == 0
+            if missed and not final and bottles.state[self.summarized] != BottleStore.GONE:
+                break
+            if not missed:
+                self.summaryText += str(bottles[self.summarized])+" "
+            elif not self.summaryMissed:
+                self.summaryText += "... "
+            self.summaryMissed = missed
+            self.summarized += 1
+
+        # lines break at the last space of every 140 letters
+        while True:
+            start = 140*self.summaryLines-self.summaryStart
+            if start >= len(self.summaryText) or (not final and len(self.summaryText) < start+140):
+                return
+            lastSpace = self.summaryText.rfind(" ", start, start+140)
+            line = self.messageFont.render(self.summaryText[:lastSpace], True, (255,255,255))
+            self.levelSurface.blit(line, (600-line.get_rect().width/2, 160+20*self.summaryLines))
+            self.summaryText = self.summaryText[lastSpace+1:]
+            self.summaryStart += lastSpace+1
+            self.summaryLines += 1
+
+    def step(self):
+        '''Level.step() -> None
+        advances the flyout, summary and level end by one tick'''
         if self.gameOver:
             return
-        
-        # update flyout
+        if not self.ended:
+            self.summarize()
+
+        # update flyout, finishing the level once the loader has placed it
         if self.flyout != None and self.flyout.is_finished():
             self.set_up_bottles()
             self.game.play()
             self.flyout = None
         elif self.flyout != None:
+            self.flyout.step()
+            if self.loading != None and self.loading.done():
+                self.finish_loading()
+
+        # slide in level end
+        if self.ended:
+            self.slide.step()
+
+    def update(self):
+        '''Level.update() -> None
+        draws the level'''
+        if self.gameOver:
+            return
+
+        if self.flyout != None:
             self.flyout.update()
-            
-        # update level end
         if self.ended:
-            if self.levelEndPos[1] < 0:
-                self.levelEndPos[1] += 10
-            self.game.get_screen().blit(self.levelSurface, self.levelEndPos)
+            self.game.get_renderer().blit(self.levelSurface, self.slide.get_pos(), self.surfaceChanged)
+            self.surfaceChanged = False
+
+    def prepare(self, levelNum, line, seed):
+        '''Level.prepare(levelNum, line, seed) -> dict
+        places the bottles of level levelNum by seed, runs on the loader thread
+        so it only works with plain python and leaves pygame to the main thread'''
+        bottles = BottleStore()
+        placer = random.Random(seed)
+        for word in line[0]:
+            image = placer.randint(1,3)
+            bottles.add(None, placer.randint(50,250), image)
+        return {"levelNum": levelNum, "line": line, "bottles": bottles}
+
+    def finish_loading(self):
+        '''Level.finish_loading() -> None
+        waits for the loader, then makes the bottles and the level end surface
+        with the source of the level on this thread'''
+        prepared = self.loading.result()
+        self.loading = None
+        for index, word in enumerate(prepared["line"][0]):
+            Bottle(self.game, word, prepared["bottles"], index=index)
+
+        surface = assetCache.copy("level.png")
+        if prepared["line"][1] != "":
+            source = self.sourceFont.render(prepared["line"][1], True, (255,255,255))
+            surface.blit(source, (600-source.get_rect().width/2, 135))
+        prepared["surface"] = surface
+        self.prepared = prepared
+
+    def load(self, levelNum, line=None):
+        '''Level.load(levelNum, line=None) -> Future
+        starts preparing level levelNum with line, or a random variant or practice
+        words, in the background'''
+        # the loader gets its own seed so the game's random stays on this thread
+        practice = self.game.get_practice()
+        if line == None and practice != None:
+            words = self.game.get_levels().get_variants(levelNum)[0][0]
+            line = practice.generate(len(words), sum(len(word) for word in words)/len(words), self.game.get_random())
+        elif line == None:
+            line = self.game.get_levels().choose(levelNum, self.game.get_random())
+        seed = self.game.get_random().getrandbits(32)
+        return self.game.get_loader().submit(self.prepare, levelNum, line, seed)
 
     def set_up_bottles(self):
         '''Level.set_up_bottles() -> None
-        sets up the bottles for the current level'''
-        line = self.game.get_lines()[self.levelNum-1].split("|")
-        bottles = self.game.get_bottles()
-        for word in line[0].split():
-            newBottle = Bottle(self.game, word)
-            bottles.append(newBottle)
-
-        # set up wpm
-        self.game.set_wpm()
-        for bottle in self.game.get_bottles():
-            bottle.set_wpm()
+        swaps in the bottles prepared for the current level'''
+        if self.prepared == None:
+            if self.loading == None:
+                self.loading = self.load(self.levelNum)
+            self.finish_loading()
+        prepared = self.prepared
+        self.prepared = None
+        self.line = prepared["line"]
+        self.lineNum = prepared["levelNum"]
+        self.game.set_bottles(prepared["bottles"])
+        self.start_summary(prepared["surface"])
+
+        # get the next level ready while this one is played
+        if self.levelNum < len(self.game.get_levels()):
+            self.nextLoading = self.load(self.levelNum+1)
+
+        # pace the level from the player's average, or of earlier sessions at first
+        wpm = self.game.get_avg_wpm()
+        if wpm == 0:
+            wpm = self.game.get_profile_wpm()
+        self.game.get_pacer().start_level(len(self.game.get_bottles()), wpm)
+        self.game.get_bottles().set_speed(self.game.get_pacer().get_speed())
 
     def redo_level(self):
         '''Level.redo_level() -> None
         sets up the level for a redo'''
         self.game.get_bottles().clear()
-        self.levelSurface = pygame.image.load("level.png")
+        self.game.get_matcher().clear()
         self.game.get_clock().reset()
         self.ended = False
 
+        # prepare the level while the flyout plays, redos keep the variant
+        if self.nextLoading != None and self.lineNum == self.levelNum-1:
+            self.loading = self.nextLoading
+        elif self.lineNum == self.levelNum:
+            self.loading = self.load(self.levelNum, self.line)
+        else:
+            self.loading = self.load(self.levelNum)
+        self.nextLoading = None
+        self.prepared = None
+
         # set up fly out
         self.flyout = Flyout(self.game, f"Level {self.levelNum}")
 
     def next_level(self):
         '''Level.next_level() -> None
         goes to the next level'''
-        if self.levelNum == len(self.game.get_lines()):
+        if self.levelNum == len(self.game.get_levels()):
             self.game.end_game()
             self.gameOver = True
             return 
@@ -457,31 +2135,24 @@ class Flyout:
         '''Flyout(game, text) -> Flyout
         constructs the flyout with text on surface'''
         self.game = game
-        self.text = pygame.font.SysFont("times new roman", 40).render(text, True, (255,255,255))
-        self.pos = [1200,200-self.text.get_rect().height/2]
-        self.start = time.time()
-        self.saved = 0
-        self.savedAdded = False
+        self.text = textCache.render(fontRegistry.get("times new roman", 40), text, (255,255,255))
+
+        # crosses the screen in as long as it did at 1300 pixels in 3 seconds
+        y = 200-self.text.get_rect().height/2
+        width = self.text.get_rect().width
+        self.tween = Tween((1170, y), (-width-1, y), (1171+width)*3/1300, ease_out_in_sine)
+        self.tween.play()
 
     def is_finished(self):
         '''Flyout.is_finished() -> bool
         returns whether the flyout has finished or not'''
-        return self.pos[0] < -self.text.get_rect().width
+        return self.tween.is_finished()
 
-    def update(self):
-        '''Flyout.update() -> None
-        updates the flyout'''
-        # update the flyout's distance on screen
-        if not self.game.is_popup():
-            if self.savedAdded:
-                self.start = time.time()
-            self.pos[0] = 1170-1300*(time.time()-self.start+self.saved)/3
-            self.savedAdded = False
-        elif not self.savedAdded:
-            self.saved += time.time() - self.start
-            self.savedAdded = True
-            
-        self.game.get_screen().blit(self.text, self.pos)
+    def step(self):
+        '''Flyout.step() -> None
+        moves the flyout'''
+        # the game clock stops for popups
+        self.tween.step()
 
         # set the game started attribute
         if self.is_finished():
@@ -489,6 +2160,11 @@ class Flyout:
         else:
             self.game.set_started(False)
 
+    def update(self):
+        '''Flyout.update() -> None
+        draws the flyout'''
+        self.game.get_renderer().blit(self.text, self.tween.get_pos())
+
 class Ship:
     '''represents the ship'''
 
@@ -496,28 +2172,34 @@ class Ship:
         '''Ship(game) -> None
         constructs the ship'''
         self.game = game
-        self.image = pygame.image.load("ship.png")
-        self.pos = [-self.image.get_rect().width-1, 51]
+        self.image = assetCache.load("ship.png")
         self.moving = False
 
+        # sails to the middle at 600 pixels a second
+        width = self.image.get_rect().width
+        self.tween = Tween((-width-1, 51), (600-width/2, 51), (601+width/2)/600, ease_out_cubic)
+
     def is_finished(self):
         '''Ship.is_finished() -> bool
         returns if the ship is finished or not'''
-        return self.pos[0] > 600-self.image.get_rect().width/2       
+        return self.tween.is_finished()
 
     def start(self):
         '''Ship.start() -> None
         starts the ship'''
         self.moving = True
-        self.started = time.time()
+        self.tween.play()
+
+    def step(self):
+        '''Ship.step() -> None
+        moves the ship'''
+        self.tween.step()
 
     def update(self):
         '''Ship.update()
-        updates the ship'''
+        draws the ship'''
         if self.moving:
-            if not self.is_finished():
-                self.pos[0] = -self.image.get_rect().width-1+3000*(time.time()-self.started)/5
-            self.game.get_screen().blit(self.image, self.pos)
+            self.game.get_renderer().blit(self.image, self.tween.get_pos())
 
 class Winning:
     '''represents the page at the end with the win'''
@@ -527,158 +2209,335 @@ class Winning:
         constructs the winning page'''
         self.game = game
         self.ship = ship
-        self.pos = [0,-400]
-        self.font = pygame.font.SysFont("times new romans", 35, bold=True)
+        self.tween = Tween((0, -400), (0, 0), 1/3, ease_out_cubic)
+        self.font = fontRegistry.get("times new romans", 35, bold=True)
+        self.surface = None
+
+    def is_finished(self):
+        '''Winning.is_finished() -> bool
+        returns whether the win message has slid in'''
+        return self.tween.is_finished()
 
     def end_surface(self):
         '''Winning.end_surface() -> Surface
         returns the end surface'''
-        surface = pygame.image.load("win.png")
-        avgWpm = self.font.render(f"Average WPM: {self.game.get_avg_wpm()}", True, (255,255,255))
+        surface = assetCache.copy("win.png")
+        avgWpm = textCache.render(self.font, f"Average WPM: {self.game.get_avg_wpm()}", (255,255,255))
         surface.blit(avgWpm, (600-avgWpm.get_rect().width/2, 265))
-        surface.blit(pygame.image.load("restart_button.png"), (950/2, 355))
+        surface.blit(assetCache.load("restart_button.png"), (950/2, 355))
         return surface
 
+    def step(self):
+        '''Winning.step() -> None
+        slides in the win message once the ship is in place'''
+        if self.ship.is_finished() and self.surface == None:
+            self.surface = self.end_surface()
+            self.tween.play()
+        self.tween.step()
+
     def update(self):
         '''Winning.update() -> None
-        updates the win message'''
-        if self.ship.is_finished():
-            if self.pos[1] < 0:
-                self.pos[1] += 20
-            self.game.get_screen().blit(self.end_surface(), self.pos)
-
-class Sound(pygame.mixer.Sound):
-    '''represents a sound for the game'''
-
-    def __init__(self, game, file, volume=0.4):
-        '''Sound(game, file, volume) -> Sound
-        constructs the sound'''
-        pygame.mixer.Sound.__init__(self, file)
-        self.game = game
-        self.set_volume(volume)
-        self.unmute()
-        if game.is_muted():
-            self.mute()
-
-    def set_volume(self, newVolume):
-        '''Sound.set_volume(newVolume) -> None
-        sets the background volume'''
-        self.originVolume = newVolume
-
-    def mute(self):
-        '''Sound.mute() -> None
-        mutes the sound'''
-        pygame.mixer.Sound.set_volume(self, 0)
-
-    def unmute(self):
-        '''Sound.unmute() -> None
-        unmutes the sound'''
-        pygame.mixer.Sound.set_volume(self, self.originVolume)
+        draws the win message'''
+        if self.surface != None:
+            self.game.get_renderer().blit(self.surface, self.tween.get_pos())
+
+class Mixer:
+    '''plays the sounds of the game on channels reserved for each pool, so
+    that sounds of one pool never cut off sounds of another'''
+
+    FORMAT = (44100, -16, 2, 512)
+    POOLS = {"keys": 3, "reward": 2, "button": 1}
+
+    def __init__(self, muted=False, volume=1):
+        '''Mixer(muted=False, volume=1) -> Mixer
+        constructs a mixer at the master volume volume, reserving the
+        channels of POOLS, or one that plays nothing without an audio device'''
+        self.muted = muted
+        self.volume = volume
+        self.sounds = {}
+        self.pools = {}
+        self.next = {}
+        try:
+            if pygame.mixer.get_init() == None:
+                pygame.mixer.init(*self.FORMAT)
+        except pygame.error:
+            return
+
+        # the pools take the first channels and sounds without one get the rest
+        total = sum(self.POOLS.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), total))
+        pygame.mixer.set_reserved(total)
+        channel = 0
+        for pool, size in self.POOLS.items():
+            self.pools[pool] = [pygame.mixer.Channel(channel+i) for i in range(size)]
+            self.next[pool] = 0
+            channel += size
+        self.apply_volume()
+
+    def is_enabled(self):
+        '''Mixer.is_enabled() -> bool
+        returns whether there is an audio device to play on'''
+        return len(self.pools) > 0
+
+    def load(self, name, file, pool, volume=0.4):
+        '''Mixer.load(name, file, pool, volume=0.4) -> None
+        loads the sound file as name at volume, played on the channels of pool
+        the sound is converted to the mixer's format as it is loaded'''
+        if not self.is_enabled():
+            return
+        sound = pygame.mixer.Sound(file)
+        sound.set_volume(volume)
+        self.sounds[name] = (sound, pool)
+
+    def play(self, name):
+        '''Mixer.play(name) -> None
+        plays the sound name on a free channel of its pool, or the one
+        that started playing longest ago'''
+        if self.muted or name not in self.sounds:
+            return
+        sound, pool = self.sounds[name]
+        channels = self.pools[pool]
+        for channel in channels:
+            if not channel.get_busy():
+                break
+        else:
+            channel = channels[self.next[pool]]
+            self.next[pool] = (self.next[pool]+1)%len(channels)
+        channel.play(sound)
+
+    def is_muted(self):
+        '''Mixer.is_muted() -> bool
+        returns whether the mixer is muted'''
+        return self.muted
+
+    def set_muted(self, muted):
+        '''Mixer.set_muted(muted) -> None
+        mutes or unmutes every sound'''
+        self.muted = muted
+        self.apply_volume()
+
+    def set_volume(self, volume):
+        '''Mixer.set_volume(volume) -> None
+        sets the master volume from 0 to 1'''
+        self.volume = volume
+        self.apply_volume()
+
+    def apply_volume(self):
+        '''Mixer.apply_volume() -> None
+        sets the master volume, or 0 if muted, on every channel'''
+        volume = 0 if self.muted else self.volume
+        for channels in self.pools.values():
+            for channel in channels:
+                channel.set_volume(volume)
 
 class Shipwrecked:
     '''represents the game'''
 
-    def __init__(self, mute=False):
-        '''Shipwrecked() -> Shipwrecked
-        constructs the game'''
-        pygame.display.set_icon(pygame.image.load("logo.png"))
+    def __init__(self, mute=False, fps=60, run=True, script="word_script.txt", log=None, seed=None, session=None,
+        profile=None, practice=None):
+        '''Shipwrecked(mute, fps, run, script, log, seed, session, profile, practice) -> Shipwrecked
+        constructs the game with the levels of script, drawing at most fps frames per second,
+        appending what happens to the event log file log and keeping the player's
+        results in the database file profile
+        practice is a list of words to make levels of the same sizes from instead
+        run is False to drive the game with Shipwrecked.frame() instead
+        seed seeds the game's random, or session is a Recorder or Replay
+        that the seed, time and input come from'''
+        self.session = session
+        if session != None:
+            seed = session.seed
+            gameClock.set_source(session.time)
+        self.random = random.Random(seed)
+        pygame.display.set_icon(assetCache.load("logo.png"))
         pygame.display.set_caption("Shipwrecked")
         self.screen = pygame.display.set_mode((1200,400))
+        pygame.key.set_repeat(400, 100)
 
         # minor attributes
         self.WATER = (0,162,232)
-        self.background = pygame.image.load("background.png")
-        self.title = pygame.image.load("title.png")
-        self.title.blit(pygame.image.load("play_button.png"), (950/2, 355))
-        self.flyoutFont = pygame.font.SysFont("times new roman", 50)
-        self.started = False
-        self.paused = True
-        self.isTitle = True
-        self.totalWords = 0
-        self.totalTime = 0
-        self.muted = mute
-        self.sounds = {}
+        self.background = assetCache.load("background.png")
+        self.title = assetCache.copy("title.png")
+        self.title.blit(assetCache.load("play_button.png"), (950/2, 355))
+        self.flyoutFont = fontRegistry.get("times new roman", 50)
+        self.mixer = Mixer(mute)
+
+        # frame pacing
+        self.fps = fps
+        self.TICK = 1/60
+        self.MAX_STEPS = 5
+        self.fpsClock = pygame.time.Clock()
+        self.stats = FrameStats()
+        self.profiler = FrameProfiler()
+        self.PROFILE_FRAMES = 300
+        self.log = EventLog(log)
+        self.profile = ProfileStore(profile)
+        self.running = True
 
         # start up
         self.screen.blit(self.background, (0,0))
         pygame.display.update()
+        self.renderer = Renderer(self.screen, self.background)
+        self.hud = PerformanceHud(self, (935, 35))
 
         # set up popup
-        popupFont = pygame.font.SysFont("times new roman", 25, bold=True)
-        self.popupBool = False
-        self.popupImg = pygame.image.load("popup.png")
+        popupFont = fontRegistry.get("times new roman", 25, bold=True)
+        self.popupImg = assetCache.copy("popup.png")
         self.popupImg.blit(popupFont.render("Yes", True, (255,255,255)), (55, 125))
         self.popupImg.blit(popupFont.render("No", True, (255,255,255)), (208, 125))
 
         # audio on/off icon
-        self.audioIcons = [pygame.transform.rotozoom(pygame.image.load(f"audio_{onoff}.png"), 0, 0.3) for onoff in ("on","off")]
-
-        # set up bottles
-        file = open("word_script.txt")
-        self.lines = []
-        for line in file.read().split("\n"):
-            if line != '':
-                try:
-                    self.lines.append(random.choice(line.split("||")[1:]))
-                except:
-                    print(line)
-                
-        file.close()
-        self.bottles = []
-        self.lastAdded = None
-        self.lastAddedSave = 0
-        
-        # other game objects
+        self.audioIcons = [pygame.transform.rotozoom(assetCache.load(f"audio_{onoff}.png"), 0, 0.3) for onoff in ("on","off")]
+
+        # set up levels and sounds
+        self.levels = load_level_pack(script)
+        self.practiceWords = self.read_recorded("practice", lambda: practice)
+        self.practice = None
+        self.loader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.mixer.load("key", "click2.wav", "keys", 0.07)
+        self.mixer.load("button", "click3.wav", "button", 0.07)
+        self.mixer.load("reward", "reward.wav", "reward", 0.3)
         self.textfield = TextField(self, (375, 355))
+
+        self.reset()
+        if run:
+            self.mainloop()
+            self.profiler.stop()
+            self.loader.shutdown()
+            self.log.close()
+            self.profile.close()
+            pygame.quit()
+
+    def reset(self):
+        '''Shipwrecked.reset() -> None
+        sets the game back to the title page, keeping the window and everything loaded'''
+        self.started = False
+        self.paused = True
+        self.isTitle = True
+        self.popupBool = False
+        self.totalWords = 0
+        self.totalTime = 0
+        self.profileWpm = self.read_recorded("profileWpm", self.profile.get_avg_wpm)
+        self.profile.start_session()
+
+        # practice the words missed up to now
+        if self.practiceWords != None:
+            missRates = self.read_recorded("missRates", self.profile.get_miss_rates)
+            self.practice = PracticeIndex(self.practiceWords, missRates)
+
+        # game objects
+        self.bottles = BottleStore()
+        self.pacer = Pacer()
+        self.matcher = WordMatcher()
+        self.spawnWatch = Stopwatch()
         self.timer = Timer(self, 60, (600,3))
         self.level = Level(self)
         self.ship = Ship(self)
         self.win = Winning(self, self.ship)
+        self.textfield.set("")
 
-        # sounds
-        self.buttonSound = Sound(self, "click3.wav", 0.07)
-        self.add_sound(self.buttonSound, "button")
-        self.add_sound(Sound(self, "reward.wav", 0.3), "reward")
-        
-        self.mainloop()
-        pygame.quit()
+        # start timing from now
+        gameClock.resume()
+        gameClock.tick()
+        self.lag = 0
+        self.renderer.invalidate()
 
     def get_screen(self):
         '''Shipwrecked.get_screen() -> Surface
         returns the screen of the game'''
         return self.screen
 
+    def get_renderer(self):
+        '''Shipwrecked.get_renderer() -> Renderer
+        returns the renderer of the game'''
+        return self.renderer
+
+    def get_stats(self):
+        '''Shipwrecked.get_stats() -> FrameStats
+        returns the frame stats of the game'''
+        return self.stats
+
+    def get_profiler(self):
+        '''Shipwrecked.get_profiler() -> FrameProfiler
+        returns the profiler of windows of frames'''
+        return self.profiler
+
+    def get_random(self):
+        '''Shipwrecked.get_random() -> Random
+        returns the seeded random of the game'''
+        return self.random
+
+    def get_practice(self):
+        '''Shipwrecked.get_practice() -> PracticeIndex
+        returns the index practice levels come from, or None when playing the script'''
+        return self.practice
+
+    def get_profile_wpm(self):
+        '''Shipwrecked.get_profile_wpm() -> float
+        returns the player's words per minute of earlier sessions, read at the reset'''
+        return self.profileWpm
+
+    def read_recorded(self, name, function):
+        '''Shipwrecked.read_recorded(name, function) -> object
+        returns function(), a value named name read from outside the game, through
+        the session so that a recording keeps it and a replay does not read it'''
+        if self.session == None:
+            return function()
+        return self.session.read(name, function)
+
+    def get_profile(self):
+        '''Shipwrecked.get_profile() -> ProfileStore
+        returns the store of the player's results'''
+        return self.profile
+
+    def get_log(self):
+        '''Shipwrecked.get_log() -> EventLog
+        returns the event log of the session'''
+        return self.log
+
     def get_field(self):
         '''Shipwrecked.get_field() -> TextField
         returns the text field'''
         return self.textfield
 
     def get_bottles(self):
-        '''Shipwrecked.get_bottles() -> list
-        returns a list fo all bottles'''
+        '''Shipwrecked.get_bottles() -> BottleStore
+        returns the store of all bottles'''
         return self.bottles
 
+    def set_bottles(self, bottles):
+        '''Shipwrecked.set_bottles(bottles) -> None
+        swaps in the store of bottles for a new level'''
+        self.bottles = bottles
+
+    def get_loader(self):
+        '''Shipwrecked.get_loader() -> ThreadPoolExecutor
+        returns the thread that prepares levels in the background'''
+        return self.loader
+
+    def get_matcher(self):
+        '''Shipwrecked.get_matcher() -> WordMatcher
+        returns the matcher for the bottles in view'''
+        return self.matcher
+
     def is_paused(self):
         '''Shipwrecked.is_paused() -> bool
         returns whether the game is paused or not'''
         return self.paused
 
-    def get_lines(self):
-        '''Shipwrecked.get_lines() -> list
-        returns a list of all lines in the text file'''
-        return self.lines
+    def get_levels(self):
+        '''Shipwrecked.get_levels() -> LevelPack
+        returns the level pack of the game'''
+        return self.levels
 
     def get_clock(self):
         '''Shipwrecked.get_clock() -> Timer
         returns the timer for the game'''
         return self.timer
 
-    def set_wpm(self):
-        '''Shipwrecked.set_wpm() -> None
-        sets the wpm of the game'''
-        self.wpm = len(self.bottles)
-        if self.wpm < self.get_avg_wpm():
-            self.wpm = self.get_avg_wpm()
+    def get_pacer(self):
+        '''Shipwrecked.get_pacer() -> Pacer
+        returns the pacer of the bottles'''
+        return self.pacer
 
     def is_popup(self):
         '''Shipwrecked.is_popup() -> bool
@@ -688,11 +2547,7 @@ class Shipwrecked:
     def is_last_word(self):
         '''Shipwrecked.is_last_word() -> bool
         returns whether there is only one word on the screen'''
-        count = 0
-        for bottle in self.bottles:
-            if (bottle.in_view() and bottle.has_word()) or not bottle.used():
-                count += 1
-        return count == 1
+        return self.bottles.count_in_view_with_word()+self.bottles.count_waiting() == 1
 
     def set_started(self, boolean):
         '''Shipwrecked.set_started(boolean) -> None
@@ -710,29 +2565,17 @@ class Shipwrecked:
     def get_bottles_correct(self):
         '''Shipwrecked.get_bottles_correct() -> int
         returns all the bottles that are correct'''
-        count = 0
-        for bottle in self.bottles:
-            if not bottle.has_word():
-                count += 1
-        return count
-
-    def get_sounds(self):
-        '''Shipwrecked.get_sounds() -> dict
-        returns the sounds'''
-        return self.sounds
-
-    def add_sound(self, sound, key=None):
-        '''Shipwrecked.add_sound(sound) -> None
-        adds a sound to the game'''
-        if key == None:
-            self.sounds[sound] = sound
-        else:
-            self.sounds[key] = sound
+        return self.bottles.get_correct()
+
+    def get_mixer(self):
+        '''Shipwrecked.get_mixer() -> Mixer
+        returns the mixer that plays the sounds'''
+        return self.mixer
 
     def is_muted(self):
         '''Shipwrecked.is_muted() -> bool
         returns whether the game is muted or not'''
-        return self.muted
+        return self.mixer.is_muted()
 
     def end_game(self):
         '''Shipwrecked.end_game() -> None
@@ -748,129 +2591,182 @@ class Shipwrecked:
     def move_next_bottle(self):
         '''Shipwrecked.move_next_bottle() -> None
         moves the next bottle in view'''
-        for bottle in self.bottles:
-            if not bottle.used():
-                bottle.move_in_view()
-                self.lastAdded = time.time()
-                self.lastAddedSave = 0
-                return
+        if self.bottles.get_next() != None:
+            self.matcher.add(self.bottles.move_in_view())
+            self.spawnWatch.reset()
+            return
 
         # check if words are all gone
         if self.level.is_ended() or len(self.bottles) == 0:
             return
         
-        hasWords = [True, True]
-        for bottle in self.bottles:
-            if bottle.in_view() and bottle.has_word():
-                hasWords[0] = False
-            if bottle.in_view():
-                hasWords[1] = False
-
-        if hasWords[0]:
+        if self.bottles.count_in_view_with_word() == 0:
             self.timer.pause()
-        if hasWords[1]:
+        if self.bottles.count_in_view() == 0:
             self.level.end_level()
             self.textfield.set("")
 
-    def update(self):
-        '''Shipwrecked.update() -> None
-        updates a single frame of the game'''
-        self.screen.blit(self.background, (0,0))
+    def step_bottles(self):
+        '''Shipwrecked.step_bottles() -> None
+        moves the bottles in view'''
+        # missed words leave the matcher with the view
+        self.bottles.set_speed(self.pacer.get_speed())
+        for bottle in self.bottles.step():
+            self.matcher.remove(bottle)
+            self.pacer.resolve(self.bottles.entered[bottle.index], self.bottles.watch.get_time(), False)
+            self.profile.add_word(str(bottle), False)
+            self.log.log("lost", str(bottle))
+
+        if self.bottles.count_in_view_with_word() == 0:
+            self.move_next_bottle()
 
-        # update audio off and on icon
-        if not self.muted:
-            self.screen.blit(self.audioIcons[0], (5,5))
-        else:
-            self.screen.blit(self.audioIcons[1], (5,5))
+    def update_bottles(self):
+        '''Shipwrecked.update_bottles() -> None
+        draws the bottles in view'''
+        for bottle in self.bottles.get_in_view():
+            bottle.update()
 
+    def step(self):
+        '''Shipwrecked.step() -> None
+        advances the game by one tick'''
         # in-game components
         if self.started and not self.ship.is_finished():
-            self.textfield.update()
+            self.stats.measure("bottles", self.step_bottles)
 
-            # update bottles
-            noWords = True
-            for bottle in self.bottles[:]:
-                if bottle.in_view():
-                    bottle.update()
-                    bottle.match(self.textfield.get())
+        # move next bottle in view
+        if not self.paused and self.spawnWatch.get_time() > self.pacer.get_interval():
+            self.move_next_bottle()
 
-                    if bottle.has_word():
-                        noWords = False
+        if not self.ship.is_finished():
+            self.stats.measure("timer", self.timer.step)
+            self.stats.measure("level", self.level.step)
+        self.stats.measure("ship", self.ship.step)
+        self.stats.measure("win", self.win.step)
 
-            if noWords:
-                self.move_next_bottle()
+    def update(self):
+        '''Shipwrecked.update() -> None
+        draws a single frame of the game'''
+        # update audio off and on icon
+        if not self.mixer.is_muted():
+            self.renderer.blit(self.audioIcons[0], (5,5))
+        else:
+            self.renderer.blit(self.audioIcons[1], (5,5))
 
-        # move next bottle in view
-        if not self.paused and self.lastAdded != None and \
-            (time.time() - self.lastAdded + self.lastAddedSave) > \
-            60/(self.wpm + self.wpm//10 - 1):
-            self.move_next_bottle()
+        # in-game components
+        if self.started and not self.ship.is_finished():
+            self.stats.measure("textfield", self.textfield.update)
+            self.stats.measure("bottles", self.update_bottles)
 
         if not self.ship.is_finished():
-            self.timer.update()
-            self.level.update()
-        self.ship.update()
-        self.win.update()
+            self.stats.measure("timer", self.timer.update)
+            self.stats.measure("level", self.level.update)
+        self.stats.measure("ship", self.ship.update)
+        self.stats.measure("win", self.win.update)
 
         # title page
         if self.isTitle:
-            self.screen.blit(self.title, (0,0))
+            self.renderer.blit(self.title, (0,0))
         # popup
         if self.popupBool:
-            self.screen.blit(self.popupImg, (450, 100))
+            self.renderer.blit(self.popupImg, (450, 100))
+        self.hud.update()
+
+    def present(self):
+        '''Shipwrecked.present() -> None
+        pushes the changed parts of the screen to the display'''
+        pygame.display.update(self.renderer.draw())
+
+    def process_events(self):
+        '''Shipwrecked.process_events() -> None
+        processes the pending events'''
+        if self.session != None:
+            events = self.session.get_frame()
+        else:
+            events = pygame.event.get()
+
+        for event in events:
+            # open popup
+            if event.type == QUIT and not self.popupBool:
+                self.show_popup()
+            # draw everything again once the window shows again
+            elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED, WINDOWRESTORED, WINDOWFOCUSGAINED):
+                self.renderer.invalidate()
+            # F3 shows the stats and F4 profiles the next frames
+            elif event.type == KEYDOWN and event.key == K_F3:
+                self.hud.toggle()
+            elif event.type == KEYDOWN and event.key == K_F4:
+                self.profiler.start(self.PROFILE_FRAMES, time.strftime("shipwrecked_%Y%m%d_%H%M%S.prof"))
+            elif event.type == KEYDOWN:
+                if self.started and not self.paused:
+                    self.textfield.process_key(event)
+
+            # buttons
+            if event.type == MOUSEBUTTONDOWN:
+                # audio on/off
+                if event.pos[0] < self.audioIcons[0].get_rect().width+5 and event.pos[1] < self.audioIcons[0].get_rect().height+5:
+                    self.mixer.set_muted(not self.mixer.is_muted())
+
+                # close window on popup
+                if self.popupBool:
+                    if 475 < event.pos[0] < 570 and 225 < event.pos[1] < 285:
+                        self.mixer.play("button")
+                        if self.popupAction == "restart":
+                            self.log.log("session", "restart")
+                            self.reset()
+                        else:
+                            self.running = False
+                    elif 628 < event.pos[0] < 723 and 225 < event.pos[1] < 285:
+                        self.mixer.play("button")
+                        self.popupBool = False
+                        gameClock.resume()
+                        if not self.popupPaused:
+                            self.play()
+                # start game button or restart button
+                elif self.isTitle or self.ship.is_finished():
+                    if 905/2 < event.pos[0] < 905/2+250 and 355 < event.pos[1] < 395:
+                        self.mixer.play("button")
+                        if not self.started:
+                            self.level.redo_level()
+                            self.isTitle = False
+                        else:
+                            self.log.log("session", "restart")
+                            self.reset()
+                else:
+                    self.level.process_mouse_click(event)
+
+    def frame(self):
+        '''Shipwrecked.frame() -> None
+        processes events, steps the game at a fixed tick and draws one frame'''
+        self.stats.begin_frame()
+        self.lag += gameClock.tick()
+        self.stats.measure("events", self.process_events)
+        if not self.running:
+            return
+
+        # run as many fixed ticks as the real time since the last frame needs,
+        # each moving game time on by one tick
+        steps = 0
+        while self.lag >= self.TICK:
+            gameClock.advance(self.TICK)
+            self.step()
+            self.lag -= self.TICK
+            steps += 1
+            # drop ticks we cannot catch up on, game time skips them too
+            if steps == self.MAX_STEPS:
+                self.lag = 0
+
+        self.update()
+        self.stats.measure("render", self.present)
+        self.stats.end_frame()
+        self.profiler.end_frame()
 
     def mainloop(self):
         '''Shipwrecked.mainloop() -> None
         the mainloop of the game'''
-        running = True
-        while running:
-            for event in pygame.event.get():
-                # open popup
-                if event.type == QUIT and not self.popupBool:
-                    self.show_popup()
-                elif event.type == KEYDOWN:
-                    if self.started and not self.paused:
-                        self.textfield.process_key(event)
-
-                # buttons
-                if event.type == MOUSEBUTTONDOWN:
-                    # audio on/off
-                    if event.pos[0] < self.audioIcons[0].get_rect().width+5 and event.pos[1] < self.audioIcons[0].get_rect().height+5:
-                        self.muted = not self.muted
-                        for sound in self.sounds:
-                            if self.muted:
-                                self.sounds[sound].mute()
-                            else:
-                                self.sounds[sound].unmute()
-                            
-                    # close window on popup
-                    if self.popupBool:
-                        if 475 < event.pos[0] < 570 and 225 < event.pos[1] < 285:
-                            self.buttonSound.play()
-                            running = False
-                            if self.popupAction == "restart":
-                                self.__init__(self.muted)
-                        elif 628 < event.pos[0] < 723 and 225 < event.pos[1] < 285:
-                            self.buttonSound.play()
-                            self.popupBool = False
-                            if not self.popupPaused:
-                                self.play()
-                    # start game button or restart button
-                    elif self.isTitle or self.ship.is_finished():
-                        if 905/2 < event.pos[0] < 905/2+250 and 355 < event.pos[1] < 395:
-                            self.buttonSound.play()
-                            if not self.started:
-                                self.level.redo_level()
-                                self.isTitle = False
-                            else:
-                                running = False
-                                self.__init__(self.muted)
-                    else:
-                        self.level.process_mouse_click(event)
-
-            if running:
-                self.update()
-                pygame.display.update()
+        gameClock.tick()
+        while self.running:
+            self.frame()
+            self.fpsClock.tick(self.fps)
 
     def pause(self):
         '''Shipwrecked.mainloop() -> None
@@ -879,11 +2775,10 @@ class Shipwrecked:
             return
         
         self.timer.pause()
-        self.lastAddedSave += time.time() - self.lastAdded
+        self.spawnWatch.pause()
 
         # pause bottles
-        for bottle in self.bottles:
-            bottle.pause()
+        self.bottles.pause()
 
         self.paused = True
 
@@ -899,17 +2794,17 @@ class Shipwrecked:
             self.move_next_bottle()
 
         self.timer.start()
-        self.lastAdded = time.time()
+        self.spawnWatch.play()
         self.paused = False
 
-        for bottle in self.bottles:
-            bottle.play()
+        self.bottles.play()
 
     def show_popup(self, action="close"):
         '''Shipwrecked.show_popup(action) -> None
         shows the popup to ask if the window should be closed
         action is either "close" or "restart"'''
         self.popupBool = True
+        gameClock.pause()
         if not self.paused:
             self.pause()
             self.popupPaused = False
@@ -917,5 +2812,31 @@ class Shipwrecked:
             self.popupPaused = True
         self.popupAction = action
     
-pygame.init()
-Shipwrecked()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="type the words on the bottles to get rescued")
+    parser.add_argument("--practice", nargs="?", const=True, default=None,
+        help="practice with words from a word list, or the script's words if no list is given")
+    parser.add_argument("--record", default=None, help="file to record the session to, to play again with headless.py")
+    parser.add_argument("--log", default="shipwrecked_events.jsonl",
+        help="event log to append to, binary if it ends in .bin, or \"\" for none")
+    parser.add_argument("--player-db", default="shipwrecked_profile.db",
+        help="database to keep the player's results in, or \"\" for none")
+    args = parser.parse_args()
+
+    practice = None
+    if args.practice == True:
+        practice = load_level_pack().get_words()
+    elif args.practice != None:
+        practice = read_word_list(args.practice)
+    if practice != None and len(practice) == 0:
+        parser.error(f"no words to practice with in {args.practice}")
+
+    session = None
+    if args.record != None:
+        session = Recorder()
+
+    pygame.mixer.pre_init(*Mixer.FORMAT)
+    pygame.init()
+    Shipwrecked(log=args.log or None, profile=args.player_db or None, session=session, practice=practice)
+    if session != None:
+        session.save(args.record)